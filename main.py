@@ -3,11 +3,35 @@
 # Enhanced Professional Edition with Android Permissions & Native File Picker
 
 import os
+import re
+import csv
+import json
+import gzip
 import sqlite3
+import hashlib
+import shutil
+import tempfile
+from pathlib import Path
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 from collections import defaultdict
+from itertools import islice
 import logging
+
+# Optional: zstd-compressed backups (gzip is used without it)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Optional: Parquet import/export
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.floatlayout import FloatLayout
@@ -20,6 +44,7 @@ from kivy.uix.popup import Popup
 from kivy.uix.filechooser import FileChooserListView
 from kivy.uix.screenmanager import ScreenManager, Screen
 from kivy.uix.spinner import Spinner
+from kivy.uix.checkbox import CheckBox
 from kivy.uix.progressbar import ProgressBar
 from kivy.core.window import Window
 from kivy.metrics import dp, sp
@@ -28,6 +53,8 @@ from kivy.clock import Clock
 from kivy.animation import Animation
 from kivy.properties import StringProperty, NumericProperty, ListProperty
 import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 # ============================================
 # ANDROID PERMISSIONS & FILE PICKER HANDLER
@@ -58,23 +85,41 @@ if platform == 'android':
     # Global variable to store file picker callback
     _file_picker_callback = None
     
+    # Picked files are copied under the app cache, one folder per pick
+    PICKED_FILES_FOLDER = 'picked_files'
+    
+    # Extension for a picked file without a display name, by MIME type
+    PICKER_MIME_EXTENSIONS = {
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": ".xlsx",
+        "application/vnd.ms-excel": ".xls",
+        "text/csv": ".csv",
+        "text/comma-separated-values": ".csv",
+        "application/vnd.apache.parquet": ".parquet"
+    }
+    
     def on_activity_result(request_code, result_code, intent):
         """
         Handle result from Android file picker.
-        This is called when user selects a file.
+        This is called when user selects one or more files.
         """
         global _file_picker_callback
         
         if request_code == 42:  # File picker request code
             if result_code == -1 and intent is not None:  # RESULT_OK = -1
                 try:
-                    uri = intent.getData()
-                    if uri:
-                        # Get actual file path from URI
-                        file_path = get_path_from_uri(uri)
+                    # Several files come back as ClipData, a single one as data
+                    clip_data = intent.getClipData()
+                    if clip_data is not None and clip_data.getItemCount() > 0:
+                        uris = [clip_data.getItemAt(i).getUri() for i in range(clip_data.getItemCount())]
+                    else:
+                        uris = [intent.getData()] if intent.getData() else []
+                    
+                    if uris:
+                        # Get actual file paths from URIs
+                        file_paths = [path for path in map(get_path_from_uri, uris) if path]
                         
-                        if file_path and _file_picker_callback:
-                            _file_picker_callback(file_path)
+                        if file_paths and _file_picker_callback:
+                            _file_picker_callback(file_paths[0] if len(file_paths) == 1 else file_paths)
                         else:
                             logger.error("Could not get file path from URI")
                             if _file_picker_callback:
@@ -92,6 +137,8 @@ if platform == 'android':
         """
         Convert Android content URI to actual file path.
         Copies file from content:// to app cache if necessary.
+        Every pick gets its own cache folder, so two files with the same
+        display name (from different folders) don't overwrite each other.
         """
         try:
             # Get content resolver
@@ -99,6 +146,7 @@ if platform == 'android':
             content_resolver = context.getContentResolver()
             
             # Get file name from URI
+            file_name = None
             cursor = None
             try:
                 # Try to get display name
@@ -109,17 +157,21 @@ if platform == 'android':
                     name_index = cursor.getColumnIndex(OpenableColumns.DISPLAY_NAME)
                     if name_index >= 0:
                         file_name = cursor.getString(name_index)
-                    else:
-                        file_name = "imported_file.xlsx"
-                else:
-                    file_name = "imported_file.xlsx"
             finally:
                 if cursor:
                     cursor.close()
             
+            if file_name:
+                file_name = os.path.basename(file_name)
+            else:
+                # Without a name the MIME type picks the reader
+                extension = PICKER_MIME_EXTENSIONS.get(content_resolver.getType(uri), '.xlsx')
+                file_name = f"imported_file{extension}"
+            
             # Create cache file path
-            cache_dir = context.getCacheDir().getAbsolutePath()
-            cache_file_path = os.path.join(cache_dir, file_name)
+            picks_dir = os.path.join(context.getCacheDir().getAbsolutePath(), PICKED_FILES_FOLDER)
+            os.makedirs(picks_dir, exist_ok=True)
+            cache_file_path = os.path.join(tempfile.mkdtemp(dir=picks_dir), file_name)
             
             # Copy content to cache file
             input_stream = content_resolver.openInputStream(uri)
@@ -156,6 +208,12 @@ if platform == 'android':
         global _file_picker_callback
         _file_picker_callback = callback
         
+        # Copies from the previous pick were imported already
+        shutil.rmtree(
+            os.path.join(PythonActivity.mActivity.getCacheDir().getAbsolutePath(), PICKED_FILES_FOLDER),
+            ignore_errors=True
+        )
+        
         try:
             # Register activity result handler
             activity.bind(on_activity_result=on_activity_result)
@@ -164,15 +222,20 @@ if platform == 'android':
             intent = Intent(Intent.ACTION_OPEN_DOCUMENT)
             intent.addCategory(Intent.CATEGORY_OPENABLE)
             
-            # Set MIME type for Excel files
-            intent.setType("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+            # EXTRA_MIME_TYPES narrows a wildcard type
+            intent.setType("*/*")
             
-            # Also allow older .xls format
+            # Excel (.xlsx, older .xls), CSV and Parquet (no registered type)
             mime_types = [
                 "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                "application/vnd.ms-excel"
+                "application/vnd.ms-excel",
+                "text/csv",
+                "text/comma-separated-values",
+                "application/vnd.apache.parquet",
+                "application/octet-stream"
             ]
             intent.putExtra(Intent.EXTRA_MIME_TYPES, mime_types)
+            intent.putExtra(Intent.EXTRA_ALLOW_MULTIPLE, True)
             
             # Start activity for result
             PythonActivity.mActivity.startActivityForResult(intent, 42)
@@ -409,6 +472,29 @@ class Config:
     # Excel import settings
     POSSIBLE_SHEET_NAMES = ['note', 'noteDataTable1', 'Sheet1', 'Feuil1', 'notes']
     REQUIRED_COLUMNS = ['Matricule', 'Nom', 'Prénom']
+    IMPORT_CHUNK_SIZE = 5000  # Rows per transaction during bulk import
+    IMPORT_STREAMING = True  # Read .xlsx row by row instead of loading the whole sheet
+    IMPORT_HASH_CHUNK_SIZE = 1024 * 1024  # Bytes per read while fingerprinting an import file
+    IMPORT_WORKERS = None  # Parallel parse workers for multi-file imports (None: one per CPU)
+    IMPORT_LOOKUP_CHUNK_SIZE = 900  # Matricules per IN (...) lookup, under SQLite's 999 variable limit
+    CSV_FALLBACK_ENCODING = 'cp1252'  # Used for CSV files that are not valid UTF-8 (Excel "CSV" on Windows)
+    
+    # Excel export settings
+    EXPORT_CHUNK_SIZE = 2000  # Rows fetched per cursor read during export
+    EXPORT_STREAMING = True  # Write .xlsx row by row instead of building a DataFrame
+    EXPORT_FORMATS = {'Excel': '.xlsx', 'CSV': '.csv', 'Parquet': '.parquet'}
+    PARQUET_ROW_GROUP_SIZE = 50000  # Rows per Parquet row group on export
+    EXPORT_FOLDER = 'exports'
+    EXPORT_WORKERS = None  # Parallel "export all groups" workers (None: one per CPU)
+    
+    # CSV/Parquet columns: students column -> file header (same as the Excel import)
+    INTERCHANGE_COLUMNS = {
+        'matricule': 'Matricule',
+        'nom': 'Nom',
+        'prenom': 'Prénom',
+        'section': 'Section',
+        'groupe': 'Groupe'
+    }
     
     # Pagination
     STUDENTS_PER_PAGE = 50
@@ -416,14 +502,47 @@ class Config:
     # Backup
     AUTO_BACKUP_INTERVAL = 3600
     BACKUP_FOLDER = 'backups'
+    BACKUP_KEEP_HOURLY = 24  # Newest backup of each of the last N hours
+    BACKUP_KEEP_DAILY = 7  # Newest backup of each of the last M days
+    BACKUP_PAGES_PER_STEP = 256  # Pages copied per backup step
+    BACKUP_MODE = 'incremental'  # 'incremental' (change-log deltas) or 'full'
+    BACKUP_MAX_DELTAS = 48  # Deltas per chain before a new full snapshot
+    CHANGELOG_TABLES = ('students', 'classes', 'attendance', 'marks', 'comments')
+    BACKUP_COMPRESSION = 'zstd'  # 'zstd' (gzip without zstandard), 'gzip' or None for raw .db
+    BACKUP_COMPRESSION_LEVELS = {'gzip': 1, 'zstd': 3}  # gzip 6 is ~2x slower for ~7% smaller
+    BACKUP_STREAM_CHUNK_SIZE = 1024 * 1024  # Bytes per read while (de)compressing
     
     # Validation
     MATRICULE_LENGTH = 12
+    ATTENDANCE_STATUSES = ('Present', 'Absent', 'Absent Justifié')
     MIN_SCORE = 0
     MAX_SCORE = 20
     
     # Database
     DB_NAME = 'student_tracker.db'
+    DB_STATEMENT_CACHE_SIZE = 128
+    
+    # SQLite PRAGMA profiles applied to every connection at open
+    # (cache_size < 0 is in KiB, mmap_size in bytes, busy_timeout in ms)
+    DB_PRAGMA_PROFILES = {
+        'android-safe': {
+            'journal_mode': 'WAL',
+            'synchronous': 'FULL',
+            'cache_size': -8000,
+            'mmap_size': 0,
+            'temp_store': 'MEMORY',
+            'busy_timeout': 5000
+        },
+        'desktop-fast': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -64000,
+            'mmap_size': 268435456,
+            'temp_store': 'MEMORY',
+            'busy_timeout': 5000
+        }
+    }
+    DB_PRAGMA_PROFILE = 'android-safe' if platform == 'android' else 'desktop-fast'
 
 # ============================================
 # UTILITY FUNCTIONS
@@ -456,13 +575,309 @@ def validate_score(score):
     except ValueError:
         return False, "Score must be a number"
 
+# Rejection reason that import summaries count as a duplicate, not as invalid
+DUPLICATE_IN_FILE_REASON = "Duplicate matricule in file"
+
+def validate_import_frame(df, groupe_name=None):
+    """
+    Vectorized validation of an imported students frame.
+    Returns (clean, rejected): clean holds matricule, nom, prenom, section and
+    groupe ready for insertion; rejected keeps the original rows plus a 'reason'.
+    """
+    def clean_text(column):
+        if column not in df.columns:
+            return pd.Series([None] * len(df), index=df.index, dtype=object)
+        
+        values = df[column]
+        text = values.astype(str).str.strip().astype(object)
+        return text.where(values.notna() & (text != ''), None)
+    
+    # Excel hands numeric matricules back as floats (123456789012.0)
+    matricule = clean_text('Matricule').str.replace(r'\.0+$', '', regex=True)
+    nom = clean_text('Nom')
+    prenom = clean_text('Prénom')
+    
+    empty_matricule = matricule.isna().to_numpy()
+    bad_length = (matricule.str.len() != Config.MATRICULE_LENGTH).to_numpy()
+    non_digit = ~matricule.str.fullmatch(r'\d+', na=False).astype(bool).to_numpy()
+    missing_name = (nom.isna() | prenom.isna()).to_numpy()
+    
+    valid = ~(empty_matricule | bad_length | non_digit | missing_name)
+    
+    # Only valid rows can shadow later copies of the same matricule
+    duplicate = matricule.where(valid).duplicated(keep='first').to_numpy() & valid
+    valid &= ~duplicate
+    
+    reason = np.select(
+        [empty_matricule, bad_length, non_digit, missing_name, duplicate],
+        [
+            "Matricule cannot be empty",
+            f"Matricule must be {Config.MATRICULE_LENGTH} characters",
+            "Matricule must contain only numbers",
+            "Nom and Prénom cannot be empty",
+            DUPLICATE_IN_FILE_REASON
+        ],
+        default=''
+    )
+    
+    if groupe_name:
+        groupe = pd.Series(groupe_name, index=df.index, dtype=object)
+    else:
+        groupe = clean_text('Groupe')
+    
+    clean = pd.DataFrame({
+        'matricule': matricule,
+        'nom': nom,
+        'prenom': prenom,
+        'section': clean_text('Section'),
+        'groupe': groupe
+    })[valid]
+    
+    rejected = df[~valid].assign(reason=reason[~valid])
+    
+    return clean, rejected
+
+class ExportCancelled(Exception):
+    """Raised inside an export once its cancel event is set"""
+
+class MissingColumnsError(ValueError):
+    """Raised when an import sheet lacks Config.REQUIRED_COLUMNS"""
+
+def open_import_source(file_path, streaming=None, sheet_name=None):
+    """
+    Open an Excel, CSV or Parquet file for batched reading, picked by
+    extension. sheet_name (Excel only) defaults to the first sheet matching
+    Config.POSSIBLE_SHEET_NAMES.
+    Returns (source, columns, batches, total); the caller closes source if set.
+    """
+    if streaming is None:
+        streaming = Config.IMPORT_STREAMING
+    
+    extension = os.path.splitext(file_path)[1].lower()
+    
+    if extension == '.csv':
+        return open_csv_stream(file_path)
+    if extension == '.parquet':
+        return open_parquet_stream(file_path)
+    # openpyxl cannot read legacy .xls files
+    if streaming and extension in ('.xlsx', '.xlsm'):
+        return open_excel_stream(file_path, sheet_name)
+    
+    columns, batches, total = read_excel_frame(file_path, sheet_name)
+    return None, columns, batches, total
+
+def list_import_sheets(file_path):
+    """Sheet names of an Excel file ([None] for CSV and Parquet, which have one table)"""
+    extension = os.path.splitext(file_path)[1].lower()
+    
+    if extension in ('.xlsx', '.xlsm'):
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(file_path, read_only=True)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+    
+    if extension == '.xls':
+        with pd.ExcelFile(file_path) as excel_file:
+            return list(excel_file.sheet_names)
+    
+    return [None]
+
+def find_import_sheet_name(sheet_names):
+    """Pick the first sheet matching Config.POSSIBLE_SHEET_NAMES, else the first sheet"""
+    for possible_name in Config.POSSIBLE_SHEET_NAMES:
+        if possible_name in sheet_names:
+            return possible_name
+    
+    return sheet_names[0]
+
+def read_excel_frame(file_path, sheet_name=None):
+    """Read the whole sheet with pandas; returns (columns, batches, total)"""
+    excel_file = pd.ExcelFile(file_path)
+    sheet_name = sheet_name or find_import_sheet_name(excel_file.sheet_names)
+    
+    logger.info(f"Reading sheet: {sheet_name}")
+    df = excel_file.parse(sheet_name)
+    excel_file.close()
+    
+    batch_size = Config.IMPORT_CHUNK_SIZE
+    batches = (df.iloc[start:start + batch_size] for start in range(0, len(df), batch_size))
+    
+    return list(df.columns), batches, len(df)
+
+def open_excel_stream(file_path, sheet_name=None):
+    """
+    Open the workbook once in read-only mode.
+    Returns (workbook, columns, batches, total) where batches yields
+    DataFrames of Config.IMPORT_CHUNK_SIZE rows; the caller closes the workbook.
+    """
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    sheet_name = sheet_name or find_import_sheet_name(workbook.sheetnames)
+    
+    logger.info(f"Streaming sheet: {sheet_name}")
+    worksheet = workbook[sheet_name]
+    rows = worksheet.iter_rows(values_only=True)
+    
+    header = next(rows, None) or ()
+    columns = [
+        str(value).strip() if value is not None else f'Unnamed: {idx}'
+        for idx, value in enumerate(header)
+    ]
+    
+    # max_row comes from the sheet's dimension record and may be missing
+    total = worksheet.max_row - 1 if worksheet.max_row else None
+    
+    width = len(columns)
+    padding = (None,) * width
+    
+    def batches():
+        while True:
+            raw_chunk = list(islice(rows, Config.IMPORT_CHUNK_SIZE))
+            if not raw_chunk:
+                break
+            
+            # Skip blank rows and fit ragged rows to the header width
+            chunk = [
+                (row + padding)[:width] for row in raw_chunk
+                if any(value is not None for value in row)
+            ]
+            if chunk:
+                yield pd.DataFrame.from_records(chunk, columns=columns)
+    
+    return workbook, columns, batches(), total
+
+def open_csv_stream(file_path):
+    """
+    Open a CSV file for batched reading; the delimiter (',', ';' or tab)
+    is sniffed from the start of the file. Files whose sample is not valid
+    UTF-8 are reopened as Config.CSV_FALLBACK_ENCODING.
+    Returns (file, columns, batches, total); the caller closes the file.
+    """
+    # Count lines for progress without holding the file in memory
+    with open(file_path, 'rb') as raw_file:
+        line_count = sum(
+            chunk.count(b'\n')
+            for chunk in iter(lambda: raw_file.read(Config.BACKUP_STREAM_CHUNK_SIZE), b'')
+        )
+    
+    encoding = 'utf-8-sig'
+    csv_file = open(file_path, encoding=encoding, newline='')
+    
+    try:
+        try:
+            sample = csv_file.read(65536)
+        except UnicodeDecodeError:
+            csv_file.close()
+            encoding = Config.CSV_FALLBACK_ENCODING
+            csv_file = open(file_path, encoding=encoding, newline='')
+            sample = csv_file.read(65536)
+        csv_file.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        
+        logger.info(f"Streaming CSV as {encoding} with delimiter: {dialect.delimiter!r}")
+        rows = csv.reader(csv_file, dialect)
+        
+        header = next(rows, None) or []
+        columns = [
+            value.strip() if value.strip() else f'Unnamed: {idx}'
+            for idx, value in enumerate(header)
+        ]
+    except Exception:
+        csv_file.close()
+        raise
+    
+    width = len(columns)
+    padding = [None] * width
+    
+    def batches():
+        while True:
+            raw_chunk = list(islice(rows, Config.IMPORT_CHUNK_SIZE))
+            if not raw_chunk:
+                break
+            
+            # Skip blank rows and fit ragged rows to the header width
+            chunk = [
+                (row + padding)[:width] for row in raw_chunk
+                if any(value.strip() for value in row)
+            ]
+            if chunk:
+                yield pd.DataFrame.from_records(chunk, columns=columns)
+    
+    return csv_file, columns, batches(), max(line_count - 1, 0)
+
+def open_parquet_stream(file_path):
+    """
+    Open a Parquet file and read it in record batches of Config.IMPORT_CHUNK_SIZE rows.
+    Returns (parquet_file, columns, batches, total); the caller closes the file.
+    """
+    if pq is None:
+        raise ValueError("Parquet import needs the pyarrow package")
+    
+    parquet_file = pq.ParquetFile(file_path)
+    
+    batches = (
+        batch.to_pandas()
+        for batch in parquet_file.iter_batches(batch_size=Config.IMPORT_CHUNK_SIZE)
+    )
+    
+    return parquet_file, parquet_file.schema_arrow.names, batches, parquet_file.metadata.num_rows
+
+def prepare_import_rows(df, groupe_name=None):
+    """Validate an imported frame and return (rows, rejected)"""
+    clean, rejected = validate_import_frame(df, groupe_name)
+    rows = list(clean.itertuples(index=False, name=None))
+    return rows, rejected
+
+def parse_import_sheet(file_path, sheet_name=None, groupe_name=None, fallback_groupe=None):
+    """
+    Read and validate one sheet without touching the database; runs in the
+    import_files worker pool, the importing thread stays the only writer.
+    fallback_groupe applies when groupe_name is unset and the sheet has
+    no Groupe column. Returns (rows, rejected_reasons, processed).
+    """
+    source, columns, batches, _ = open_import_source(file_path, sheet_name=sheet_name)
+    
+    try:
+        missing_columns = [col for col in Config.REQUIRED_COLUMNS if col not in columns]
+        if missing_columns:
+            raise MissingColumnsError(f"Missing required columns: {', '.join(missing_columns)}")
+        
+        if not groupe_name and 'Groupe' not in columns:
+            groupe_name = fallback_groupe
+        
+        rows = []
+        rejected_reasons = defaultdict(int)
+        processed = 0
+        
+        for batch in batches:
+            batch_rows, rejected = prepare_import_rows(batch, groupe_name)
+            rows.extend(batch_rows)
+            for reason, count in rejected['reason'].value_counts().items():
+                rejected_reasons[reason] += int(count)
+            processed += len(batch)
+        
+        return rows, dict(rejected_reasons), processed
+    finally:
+        if source is not None:
+            source.close()
+
 # ============================================
 # ENHANCED DATABASE HANDLER
 # ============================================
 class StudentTrackerDB:
     """Enhanced database handler"""
     
-    def __init__(self, db_name=Config.DB_NAME):
+    # Full snapshot file suffix per backup compression codec
+    BACKUP_SUFFIXES = {None: '.db', 'gzip': '.db.gz', 'zstd': '.db.zst'}
+    
+    def __init__(self, db_name=Config.DB_NAME, read_only=False):
         # On Android, store database in external storage
         if platform == 'android':
             storage_path = get_external_storage_path()
@@ -471,13 +886,152 @@ class StudentTrackerDB:
             self.db_name = os.path.join(app_folder, db_name)
         else:
             self.db_name = db_name
-            
-        self.init_database()
+        
+        # Read-only handlers (export workers) open mode=ro connections and
+        # leave the schema alone
+        self.read_only = read_only
+        
+        # One long-lived connection per thread (UI, import, backup workers)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        
+        # PRAGMA profile applied to every new connection
+        self.pragma_profile = Config.DB_PRAGMA_PROFILE
+        if self.pragma_profile not in Config.DB_PRAGMA_PROFILES:
+            logger.warning(f"Unknown PRAGMA profile '{self.pragma_profile}', using 'android-safe'")
+            self.pragma_profile = 'android-safe'
+        self.pragmas = Config.DB_PRAGMA_PROFILES[self.pragma_profile]
+        
+        # Set by init_database when the SQLite build supports FTS5
+        self.fts_enabled = False
+        
+        # Set by init_database when the SQLite build has the JSON functions
+        self.changelog_enabled = False
+        
+        # Bumped on every committed change to students; invalidates cached counts
+        self.write_generation = 0
+        self._count_cache = {}
+        self._count_cache_lock = threading.Lock()
+        
+        # Only one backup runs at a time (button, auto-backup, on_stop)
+        self._backup_lock = threading.Lock()
+        
+        # Import file hashes keyed by (path, size, mtime)
+        self._fingerprints = {}
+        self._fingerprint_lock = threading.Lock()
+        
+        if not self.read_only:
+            self.init_database()
+        
+        # Read-only connection whose PRAGMA data_version changes whenever any
+        # other connection commits; detects changes when there is no change log
+        self._watch_conn = None
+        self._watch_lock = threading.Lock()
+        self._last_backup_version = None
+        if not self.read_only:
+            self._watch_conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        
         logger.info(f"Database initialized: {self.db_name}")
+        logger.info(f"Database PRAGMA profile: {self.pragma_profile} {self.pragmas}")
+    
+    def _get_connection(self):
+        """Return the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        
+        if conn is None:
+            # check_same_thread is off only so close() can run from on_stop;
+            # each connection is still used by the thread that opened it
+            if self.read_only:
+                # as_uri() percent-encodes '#', '?' and '%' in the path
+                database, uri = Path(self.db_name).resolve().as_uri() + "?mode=ro", True
+            else:
+                database, uri = self.db_name, False
+            
+            conn = sqlite3.connect(
+                database,
+                timeout=self.pragmas['busy_timeout'] / 1000,
+                check_same_thread=False,
+                cached_statements=Config.DB_STATEMENT_CACHE_SIZE,
+                uri=uri
+            )
+            self._apply_pragmas(conn)
+            self._local.conn = conn
+            
+            with self._connections_lock:
+                self._connections.append(conn)
+            
+            logger.info(f"Opened database connection for thread: {threading.current_thread().name}")
+        
+        return conn
+    
+    def _apply_pragmas(self, conn):
+        """Apply the selected PRAGMA profile to a new connection"""
+        # The journal mode is a property of the file; read-only connections keep it
+        if not self.read_only:
+            journal_mode = conn.execute(
+                f"PRAGMA journal_mode = {self.pragmas['journal_mode']}"
+            ).fetchone()[0]
+            
+            # Some storage (e.g. FUSE mounts) cannot host the WAL shared memory file
+            if journal_mode.upper() != self.pragmas['journal_mode'].upper():
+                logger.warning(f"Could not enable {self.pragmas['journal_mode']} journal, using: {journal_mode}")
+        
+        conn.execute(f"PRAGMA synchronous = {self.pragmas['synchronous']}")
+        conn.execute(f"PRAGMA cache_size = {int(self.pragmas['cache_size'])}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.pragmas['mmap_size'])}")
+        conn.execute(f"PRAGMA temp_store = {self.pragmas['temp_store']}")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.pragmas['busy_timeout'])}")
+        
+        # Let REPLACE conflict deletions fire DELETE triggers so the
+        # trigger-maintained tables stay in sync
+        conn.execute("PRAGMA recursive_triggers = ON")
+    
+    def _mark_students_changed(self):
+        """Record a committed change to students and drop cached counts"""
+        with self._count_cache_lock:
+            self.write_generation += 1
+            self._count_cache.clear()
+    
+    def release_connection(self):
+        """Close the calling thread's connection (call at the end of worker threads)"""
+        conn = getattr(self._local, 'conn', None)
+        
+        if conn is None:
+            return
+        
+        self._local.conn = None
+        
+        with self._connections_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        
+        conn.close()
+    
+    def close(self):
+        """Close all pooled connections"""
+        with self._connections_lock:
+            connections = self._connections
+            self._connections = []
+        
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Error closing connection: {str(e)}")
+        
+        self._local = threading.local()
+        
+        with self._watch_lock:
+            if self._watch_conn is not None:
+                self._watch_conn.close()
+                self._watch_conn = None
+        
+        logger.info("Database connections closed")
     
     def init_database(self):
         """Initialize database with required tables and indexes"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         try:
@@ -548,15 +1102,48 @@ class StudentTrackerDB:
                 )
             ''')
             
+            # Import ledger: one row per imported file, to skip identical re-imports
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS import_ledger (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    file_name TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    file_size INTEGER NOT NULL,
+                    file_mtime REAL NOT NULL,
+                    groupe TEXT,
+                    mode TEXT NOT NULL,
+                    imported_count INTEGER NOT NULL DEFAULT 0,
+                    imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
             # Create indexes for performance
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_student_matricule ON students(matricule)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_student_groupe ON students(groupe)')
+            # Sort-order indexes for keyset pagination (rowid id is implicitly appended)
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_student_name ON students(nom, prenom)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_student_groupe_name ON students(groupe, nom, prenom)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_student ON attendance(student_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_class ON attendance(class_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_marks_student ON marks(student_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_marks_class ON marks(class_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_comments_student ON comments(student_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_comments_class ON comments(class_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_import_ledger_hash ON import_ledger(content_hash)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_import_ledger_path ON import_ledger(file_path, file_size, file_mtime)')
+            
+            # Full-text search index for student lookup
+            self._init_search_index(cursor)
+            
+            # Group catalog with per-group student counts
+            self._init_groupe_catalog(cursor)
+            
+            # Per-student attendance and marks aggregates
+            self._init_student_aggregates(cursor)
+            
+            # Row-level change log for incremental backups
+            self._init_change_log(cursor)
             
             conn.commit()
             logger.info("Database tables and indexes created successfully")
@@ -565,7 +1152,348 @@ class StudentTrackerDB:
             logger.error(f"Database initialization error: {str(e)}")
             conn.rollback()
         finally:
-            conn.close()
+            cursor.close()
+    
+    def _init_search_index(self, cursor):
+        """Create the FTS5 index over matricule/nom/prenom and its sync triggers"""
+        try:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students_fts'"
+            )
+            exists = cursor.fetchone() is not None
+            
+            # External-content table: the text lives in students only.
+            # remove_diacritics makes "Helene" match "Hélène".
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5(
+                    matricule, nom, prenom,
+                    content='students',
+                    content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='2 3'
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS students_fts_insert AFTER INSERT ON students BEGIN
+                    INSERT INTO students_fts(rowid, matricule, nom, prenom)
+                    VALUES (new.id, new.matricule, new.nom, new.prenom);
+                END
+            ''')
+            
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS students_fts_delete AFTER DELETE ON students BEGIN
+                    INSERT INTO students_fts(students_fts, rowid, matricule, nom, prenom)
+                    VALUES ('delete', old.id, old.matricule, old.nom, old.prenom);
+                END
+            ''')
+            
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS students_fts_update
+                AFTER UPDATE OF matricule, nom, prenom ON students BEGIN
+                    INSERT INTO students_fts(students_fts, rowid, matricule, nom, prenom)
+                    VALUES ('delete', old.id, old.matricule, old.nom, old.prenom);
+                    INSERT INTO students_fts(rowid, matricule, nom, prenom)
+                    VALUES (new.id, new.matricule, new.nom, new.prenom);
+                END
+            ''')
+            
+            # Index students that existed before the FTS table was added
+            if not exists:
+                cursor.execute("INSERT INTO students_fts(students_fts) VALUES ('rebuild')")
+            
+            self.fts_enabled = True
+            
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: search falls back to LIKE
+            logger.warning(f"Full-text search unavailable, using LIKE search: {str(e)}")
+            self.fts_enabled = False
+    
+    def _init_groupe_catalog(self, cursor):
+        """Create the groupes catalog and the triggers that keep its counts current"""
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'groupes'"
+        )
+        exists = cursor.fetchone() is not None
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS groupes (
+                name TEXT PRIMARY KEY,
+                student_count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS groupes_student_insert
+            AFTER INSERT ON students WHEN new.groupe IS NOT NULL BEGIN
+                INSERT INTO groupes (name, student_count) VALUES (new.groupe, 1)
+                ON CONFLICT(name) DO UPDATE SET student_count = student_count + 1;
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS groupes_student_delete
+            AFTER DELETE ON students WHEN old.groupe IS NOT NULL BEGIN
+                UPDATE groupes SET student_count = student_count - 1 WHERE name = old.groupe;
+                DELETE FROM groupes WHERE name = old.groupe AND student_count <= 0;
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS groupes_student_update
+            AFTER UPDATE OF groupe ON students WHEN old.groupe IS NOT new.groupe BEGIN
+                UPDATE groupes SET student_count = student_count - 1 WHERE name = old.groupe;
+                DELETE FROM groupes WHERE name = old.groupe AND student_count <= 0;
+                INSERT INTO groupes (name, student_count)
+                SELECT new.groupe, 1 WHERE new.groupe IS NOT NULL
+                ON CONFLICT(name) DO UPDATE SET student_count = student_count + 1;
+            END
+        ''')
+        
+        # Fill the catalog for databases created before it existed
+        if not exists:
+            self._rebuild_groupe_catalog(cursor)
+    
+    def _rebuild_groupe_catalog(self, cursor):
+        """Recompute the groupes catalog from the students table"""
+        cursor.execute("DELETE FROM groupes")
+        cursor.execute('''
+            INSERT INTO groupes (name, student_count)
+            SELECT groupe, COUNT(*) FROM students
+            WHERE groupe IS NOT NULL
+            GROUP BY groupe
+        ''')
+    
+    def _init_student_aggregates(self, cursor):
+        """Create student_aggregates and the attendance/marks triggers that maintain it"""
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'student_aggregates'"
+        )
+        exists = cursor.fetchone() is not None
+        
+        # mark_count counts every marks row; score_* only non-NULL scores
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS student_aggregates (
+                student_id INTEGER PRIMARY KEY,
+                present_count INTEGER NOT NULL DEFAULT 0,
+                absent_count INTEGER NOT NULL DEFAULT 0,
+                justified_count INTEGER NOT NULL DEFAULT 0,
+                mark_count INTEGER NOT NULL DEFAULT 0,
+                score_count INTEGER NOT NULL DEFAULT 0,
+                score_sum REAL NOT NULL DEFAULT 0,
+                score_min REAL,
+                score_max REAL
+            )
+        ''')
+        
+        # Attendance: adjust the three status counters
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS aggregates_attendance_insert AFTER INSERT ON attendance BEGIN
+                INSERT INTO student_aggregates (student_id) VALUES (new.student_id)
+                ON CONFLICT(student_id) DO NOTHING;
+                UPDATE student_aggregates SET
+                    present_count = present_count + (new.status IS 'Present'),
+                    absent_count = absent_count + (new.status IS 'Absent'),
+                    justified_count = justified_count + (new.status IS 'Absent Justifié')
+                WHERE student_id = new.student_id;
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS aggregates_attendance_delete AFTER DELETE ON attendance BEGIN
+                UPDATE student_aggregates SET
+                    present_count = present_count - (old.status IS 'Present'),
+                    absent_count = absent_count - (old.status IS 'Absent'),
+                    justified_count = justified_count - (old.status IS 'Absent Justifié')
+                WHERE student_id = old.student_id;
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS aggregates_attendance_update
+            AFTER UPDATE OF student_id, status ON attendance BEGIN
+                UPDATE student_aggregates SET
+                    present_count = present_count - (old.status IS 'Present'),
+                    absent_count = absent_count - (old.status IS 'Absent'),
+                    justified_count = justified_count - (old.status IS 'Absent Justifié')
+                WHERE student_id = old.student_id;
+                INSERT INTO student_aggregates (student_id) VALUES (new.student_id)
+                ON CONFLICT(student_id) DO NOTHING;
+                UPDATE student_aggregates SET
+                    present_count = present_count + (new.status IS 'Present'),
+                    absent_count = absent_count + (new.status IS 'Absent'),
+                    justified_count = justified_count + (new.status IS 'Absent Justifié')
+                WHERE student_id = new.student_id;
+            END
+        ''')
+        
+        # Rows are created with an UPSERT rather than INSERT OR IGNORE: an outer
+        # INSERT OR REPLACE would override OR IGNORE inside the trigger and reset the row.
+        
+        # Marks: counts and sums are incremental; min/max can only be
+        # extended on insert and are re-read from idx_marks_student otherwise
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS aggregates_marks_insert AFTER INSERT ON marks BEGIN
+                INSERT INTO student_aggregates (student_id) VALUES (new.student_id)
+                ON CONFLICT(student_id) DO NOTHING;
+                UPDATE student_aggregates SET
+                    mark_count = mark_count + 1,
+                    score_count = score_count + (new.score IS NOT NULL),
+                    score_sum = score_sum + COALESCE(new.score, 0),
+                    score_min = MIN(COALESCE(score_min, new.score), COALESCE(new.score, score_min)),
+                    score_max = MAX(COALESCE(score_max, new.score), COALESCE(new.score, score_max))
+                WHERE student_id = new.student_id;
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS aggregates_marks_delete AFTER DELETE ON marks BEGIN
+                UPDATE student_aggregates SET
+                    mark_count = mark_count - 1,
+                    score_count = score_count - (old.score IS NOT NULL),
+                    score_sum = score_sum - COALESCE(old.score, 0),
+                    score_min = (SELECT MIN(score) FROM marks WHERE student_id = old.student_id),
+                    score_max = (SELECT MAX(score) FROM marks WHERE student_id = old.student_id)
+                WHERE student_id = old.student_id;
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS aggregates_marks_update
+            AFTER UPDATE OF student_id, score ON marks BEGIN
+                UPDATE student_aggregates SET
+                    mark_count = mark_count - 1,
+                    score_count = score_count - (old.score IS NOT NULL),
+                    score_sum = score_sum - COALESCE(old.score, 0)
+                WHERE student_id = old.student_id;
+                INSERT INTO student_aggregates (student_id) VALUES (new.student_id)
+                ON CONFLICT(student_id) DO NOTHING;
+                UPDATE student_aggregates SET
+                    mark_count = mark_count + 1,
+                    score_count = score_count + (new.score IS NOT NULL),
+                    score_sum = score_sum + COALESCE(new.score, 0)
+                WHERE student_id = new.student_id;
+                UPDATE student_aggregates SET
+                    score_min = (SELECT MIN(score) FROM marks WHERE marks.student_id = student_aggregates.student_id),
+                    score_max = (SELECT MAX(score) FROM marks WHERE marks.student_id = student_aggregates.student_id)
+                WHERE student_id IN (old.student_id, new.student_id);
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS aggregates_student_delete AFTER DELETE ON students BEGIN
+                DELETE FROM student_aggregates WHERE student_id = old.id;
+            END
+        ''')
+        
+        # Fill the table for databases created before it existed
+        if not exists:
+            self._rebuild_student_aggregates(cursor)
+    
+    def _rebuild_student_aggregates(self, cursor):
+        """Recompute student_aggregates from the raw attendance and marks rows"""
+        cursor.execute("DELETE FROM student_aggregates")
+        
+        cursor.execute('''
+            INSERT INTO student_aggregates (student_id, present_count, absent_count, justified_count)
+            SELECT student_id,
+                   SUM(status IS 'Present'),
+                   SUM(status IS 'Absent'),
+                   SUM(status IS 'Absent Justifié')
+            FROM attendance
+            WHERE student_id IN (SELECT id FROM students)
+            GROUP BY student_id
+        ''')
+        
+        cursor.execute('''
+            INSERT INTO student_aggregates (
+                student_id, mark_count, score_count, score_sum, score_min, score_max
+            )
+            SELECT student_id, COUNT(*), COUNT(score), COALESCE(SUM(score), 0), MIN(score), MAX(score)
+            FROM marks
+            WHERE student_id IN (SELECT id FROM students)
+            GROUP BY student_id
+            ON CONFLICT(student_id) DO UPDATE SET
+                mark_count = excluded.mark_count,
+                score_count = excluded.score_count,
+                score_sum = excluded.score_sum,
+                score_min = excluded.score_min,
+                score_max = excluded.score_max
+        ''')
+    
+    def _init_change_log(self, cursor):
+        """
+        Create change_log and the triggers that record every row-level insert,
+        update and delete on Config.CHANGELOG_TABLES. Inserts and updates keep
+        the full row image as JSON, deletes only the id; incremental backups
+        write the entries logged since the last backup.
+        """
+        try:
+            cursor.execute("SELECT json_object('id', 1)")
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS change_log (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    table_name TEXT NOT NULL,
+                    operation TEXT NOT NULL,
+                    row_id INTEGER NOT NULL,
+                    row_data TEXT
+                )
+            ''')
+            
+            # Chain bookkeeping: base snapshot, its sequence and the last backed up sequence
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS backup_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            
+            for table in Config.CHANGELOG_TABLES:
+                cursor.execute(f"PRAGMA table_info({table})")
+                columns = [row[1] for row in cursor.fetchall()]
+                row_image = ', '.join(f"'{column}', new.{column}" for column in columns)
+                
+                for operation in ('INSERT', 'UPDATE'):
+                    cursor.execute(f'''
+                        CREATE TRIGGER IF NOT EXISTS changelog_{table}_{operation.lower()}
+                        AFTER {operation} ON {table} BEGIN
+                            INSERT INTO change_log (table_name, operation, row_id, row_data)
+                            VALUES ('{table}', '{operation}', new.id, json_object({row_image}));
+                        END
+                    ''')
+                
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS changelog_{table}_delete
+                    AFTER DELETE ON {table} BEGIN
+                        INSERT INTO change_log (table_name, operation, row_id)
+                        VALUES ('{table}', 'DELETE', old.id);
+                    END
+                ''')
+            
+            self.changelog_enabled = True
+        
+        except sqlite3.OperationalError as e:
+            # SQLite built without JSON functions: every backup is a full copy
+            logger.warning(f"Change log unavailable, using full backups only: {str(e)}")
+            self.changelog_enabled = False
+    
+    def _build_search_filter(self, search_term):
+        """Return (sql, params) restricting students to those matching search_term"""
+        if self.fts_enabled:
+            # Every word must match as a prefix: "benn ya" -> "benn"* "ya"*
+            tokens = re.findall(r'\w+', search_term)
+            if not tokens:
+                return " AND 0", []
+            
+            match_query = ' '.join(f'"{token}"*' for token in tokens)
+            return " AND id IN (SELECT rowid FROM students_fts WHERE students_fts MATCH ?)", [match_query]
+        
+        search_pattern = f"%{search_term}%"
+        return (
+            " AND (matricule LIKE ? OR nom LIKE ? OR prenom LIKE ?)",
+            [search_pattern, search_pattern, search_pattern]
+        )
     
     def add_student(self, matricule, nom, prenom, section=None, groupe=None):
         """Add a new student"""
@@ -574,7 +1502,7 @@ class StudentTrackerDB:
         if not is_valid:
             return False, error_msg
         
-        conn = sqlite3.connect(self.db_name)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         try:
@@ -584,67 +1512,125 @@ class StudentTrackerDB:
             ''', (matricule.strip(), nom.strip(), prenom.strip(), section, groupe))
             
             conn.commit()
+            self._mark_students_changed()
             logger.info(f"Student added: {matricule} - {nom} {prenom}")
             return True, "Student added successfully"
             
         except sqlite3.IntegrityError:
+            conn.rollback()
             return False, f"Student with matricule {matricule} already exists"
         except sqlite3.Error as e:
+            conn.rollback()
             logger.error(f"Error adding student: {str(e)}")
             return False, f"Database error: {str(e)}"
         finally:
-            conn.close()
+            cursor.close()
     
-    def get_all_students(self, groupe=None, search_term=None, offset=0, limit=50):
-        """Get all students with optional filtering and pagination"""
-        conn = sqlite3.connect(self.db_name)
+    def _build_student_filters(self, groupe=None, search_term=None):
+        """Return (where_sql, params) for the group and search filters"""
+        where_sql = " WHERE 1=1"
+        params = []
+        
+        if groupe:
+            where_sql += " AND groupe = ?"
+            params.append(groupe)
+        
+        if search_term:
+            search_sql, search_params = self._build_search_filter(search_term)
+            where_sql += search_sql
+            params.extend(search_params)
+        
+        return where_sql, params
+    
+    def count_students(self, groupe=None, search_term=None):
+        """
+        Count students matching the group and search filters.
+        Counts are cached per (groupe, search_term) until the next write.
+        """
+        cache_key = (groupe or None, search_term or None)
+        
+        with self._count_cache_lock:
+            generation = self.write_generation
+            if cache_key in self._count_cache:
+                return self._count_cache[cache_key]
+        
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         try:
-            query = "SELECT * FROM students WHERE 1=1"
-            params = []
-            
-            if groupe:
-                query += " AND groupe = ?"
-                params.append(groupe)
+            where_sql, params = self._build_student_filters(groupe, search_term)
+            cursor.execute("SELECT COUNT(*) FROM students" + where_sql, params)
+            total_count = cursor.fetchone()[0]
             
-            if search_term:
-                query += " AND (matricule LIKE ? OR nom LIKE ? OR prenom LIKE ?)"
-                search_pattern = f"%{search_term}%"
-                params.extend([search_pattern, search_pattern, search_pattern])
+            # Don't cache a count that raced with a write
+            with self._count_cache_lock:
+                if generation == self.write_generation:
+                    self._count_cache[cache_key] = total_count
             
-            query += " ORDER BY nom, prenom LIMIT ? OFFSET ?"
-            params.extend([limit, offset])
+            return total_count
+        except sqlite3.Error as e:
+            logger.error(f"Error counting students: {str(e)}")
+            return 0
+        finally:
+            cursor.close()
+    
+    def get_all_students(self, groupe=None, search_term=None, offset=0, limit=50):
+        """Get all students with optional filtering and pagination"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            where_sql, params = self._build_student_filters(groupe, search_term)
             
-            cursor.execute(query, params)
+            query = "SELECT * FROM students" + where_sql + " ORDER BY nom, prenom, id LIMIT ? OFFSET ?"
+            cursor.execute(query, params + [limit, offset])
             students = cursor.fetchall()
             
-            # Get total count
-            count_query = "SELECT COUNT(*) FROM students WHERE 1=1"
-            count_params = []
+            return students, self.count_students(groupe, search_term)
             
-            if groupe:
-                count_query += " AND groupe = ?"
-                count_params.append(groupe)
-            
-            if search_term:
-                count_query += " AND (matricule LIKE ? OR nom LIKE ? OR prenom LIKE ?)"
-                count_params.extend([search_pattern, search_pattern, search_pattern])
+        except sqlite3.Error as e:
+            logger.error(f"Error fetching students: {str(e)}")
+            return [], 0
+        finally:
+            cursor.close()
+    
+    def get_students_page(self, groupe=None, search_term=None, after=None, before=None, limit=50):
+        """
+        Keyset (seek) pagination ordered by (nom, prenom, id).
+        Pass the last row's (nom, prenom, id) as after for the next page, or the
+        first row's as before for the previous page; each page is an index range scan.
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            where_sql, params = self._build_student_filters(groupe, search_term)
+            query = "SELECT * FROM students" + where_sql
             
-            cursor.execute(count_query, count_params)
-            total_count = cursor.fetchone()[0]
+            if before:
+                # Walk backwards from the cursor, then restore ascending order
+                query += " AND (nom, prenom, id) < (?, ?, ?) ORDER BY nom DESC, prenom DESC, id DESC LIMIT ?"
+                cursor.execute(query, params + list(before) + [limit])
+                students = cursor.fetchall()[::-1]
+            else:
+                if after:
+                    query += " AND (nom, prenom, id) > (?, ?, ?)"
+                    params += list(after)
+                query += " ORDER BY nom, prenom, id LIMIT ?"
+                cursor.execute(query, params + [limit])
+                students = cursor.fetchall()
             
-            return students, total_count
+            return students, self.count_students(groupe, search_term)
             
         except sqlite3.Error as e:
-            logger.error(f"Error fetching students: {str(e)}")
+            logger.error(f"Error fetching students page: {str(e)}")
             return [], 0
         finally:
-            conn.close()
+            cursor.close()
     
     def get_student_by_id(self, student_id):
         """Get student by ID"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         try:
@@ -654,7 +1640,7 @@ class StudentTrackerDB:
             logger.error(f"Error fetching student: {str(e)}")
             return None
         finally:
-            conn.close()
+            cursor.close()
     
     def update_student(self, student_id, matricule, nom, prenom, section=None, groupe=None):
         """Update student information"""
@@ -663,7 +1649,7 @@ class StudentTrackerDB:
         if not is_valid:
             return False, error_msg
         
-        conn = sqlite3.connect(self.db_name)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         try:
@@ -677,22 +1663,25 @@ class StudentTrackerDB:
             conn.commit()
             
             if cursor.rowcount > 0:
+                self._mark_students_changed()
                 logger.info(f"Student updated: {student_id}")
                 return True, "Student updated successfully"
             else:
                 return False, "Student not found"
                 
         except sqlite3.IntegrityError:
+            conn.rollback()
             return False, f"Student with matricule {matricule} already exists"
         except sqlite3.Error as e:
+            conn.rollback()
             logger.error(f"Error updating student: {str(e)}")
             return False, f"Database error: {str(e)}"
         finally:
-            conn.close()
+            cursor.close()
     
     def delete_student(self, student_id):
         """Delete a student and all related records"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         try:
@@ -700,160 +1689,1748 @@ class StudentTrackerDB:
             conn.commit()
             
             if cursor.rowcount > 0:
+                self._mark_students_changed()
                 logger.info(f"Student deleted: {student_id}")
                 return True, "Student and all related records deleted successfully"
             else:
                 return False, "Student not found"
                 
         except sqlite3.Error as e:
+            conn.rollback()
             logger.error(f"Error deleting student: {str(e)}")
             return False, f"Database error: {str(e)}"
         finally:
-            conn.close()
+            cursor.close()
     
     def get_all_groupes(self):
         """Get all unique group names"""
-        conn = sqlite3.connect(self.db_name)
+        return [name for name, _ in self.get_groupe_counts()]
+    
+    def get_groupe_counts(self):
+        """Get (groupe, student_count) pairs from the group catalog"""
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         try:
-            cursor.execute("SELECT DISTINCT groupe FROM students WHERE groupe IS NOT NULL ORDER BY groupe")
-            groupes = [row[0] for row in cursor.fetchall()]
-            return groupes
+            cursor.execute("SELECT name, student_count FROM groupes WHERE student_count > 0 ORDER BY name")
+            return cursor.fetchall()
         except sqlite3.Error as e:
             logger.error(f"Error fetching groups: {str(e)}")
             return []
         finally:
-            conn.close()
+            cursor.close()
+    
+    def rebuild_student_aggregates(self):
+        """Repair student_aggregates by recomputing it from attendance and marks"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            self._rebuild_student_aggregates(cursor)
+            conn.commit()
+            logger.info("Student aggregates rebuilt")
+            return True, "Student statistics rebuilt successfully"
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Error rebuilding student aggregates: {str(e)}")
+            return False, f"Database error: {str(e)}"
+        finally:
+            cursor.close()
+    
+    def rebuild_groupe_catalog(self):
+        """Repair the group catalog by recomputing it from students"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            self._rebuild_groupe_catalog(cursor)
+            conn.commit()
+            logger.info("Group catalog rebuilt")
+            return True, "Group catalog rebuilt successfully"
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Error rebuilding group catalog: {str(e)}")
+            return False, f"Database error: {str(e)}"
+        finally:
+            cursor.close()
+    
+    def import_from_excel(self, file_path, groupe_name=None, progress_callback=None, streaming=None,
+                          mode='insert', remove_missing=False, force=False):
+        """
+        Import students from an Excel, CSV or Parquet file (picked by extension).
+        With streaming (default: Config.IMPORT_STREAMING) .xlsx files are read
+        row by row and written in batches, so memory stays flat as the file grows.
+        CSV and Parquet files are always read in batches.
+        Each batch is split against the stored students with the same
+        matricules (an indexed lookup) into new, unchanged and changed. mode='insert' writes only the new rows;
+        mode='sync' also updates the changed ones, all in one transaction, and
+        with remove_missing deletes groupe_name's students absent from the file.
+        A file whose content was already imported with the same group and mode
+        is skipped as "already imported" unless force is set.
+        """
+        source = None
+        
+        try:
+            logger.info(f"Attempting to import from: {file_path}")
+            
+            # Check if file exists
+            if not os.path.exists(file_path):
+                return False, f"File not found: {file_path}", 0
+            
+            if mode not in ('insert', 'sync'):
+                return False, f"Unknown import mode: {mode}", 0
+            
+            if remove_missing and (mode != 'sync' or not groupe_name):
+                return False, "Removing missing students needs sync mode and a group name", 0
+            
+            fingerprint = self.fingerprint_file(file_path)
+            if not force:
+                previous = self.find_previous_import(file_path, groupe_name, mode, remove_missing)
+                if previous:
+                    message = (
+                        f"Already imported on {previous['imported_at']} "
+                        f"({previous['file_name']}), nothing to do"
+                    )
+                    logger.info(message)
+                    return True, message, 0
+            
+            source, columns, batches, total = open_import_source(file_path, streaming)
+            
+            # Validate required columns
+            missing_columns = [col for col in Config.REQUIRED_COLUMNS if col not in columns]
+            if missing_columns:
+                return False, f"Missing required columns: {', '.join(missing_columns)}", 0
+            
+            success_count = 0
+            unchanged_count = 0
+            changed_count = 0
+            invalid_count = 0
+            duplicate_count = 0
+            processed = 0
+            rejected_reasons = defaultdict(int)
+            
+            seen = set()
+            sync_rows = []
+            kept_matricules = set()
+            
+            # Validate and classify each batch before it reaches the database
+            for batch in batches:
+                rows, rejected = prepare_import_rows(batch, groupe_name)
+                new_rows, unchanged_rows, changed_rows, repeated_rows = self._split_import_rows(
+                    rows, seen
+                )
+                
+                batch_inserted, batch_duplicates = 0, 0
+                if mode == 'sync':
+                    # Diffs are written together once the whole file is read
+                    sync_rows.extend(new_rows)
+                    sync_rows.extend(changed_rows)
+                    batch_inserted = len(new_rows)
+                    
+                    # Invalid rows still name students that must not be removed
+                    if remove_missing and 'Matricule' in rejected:
+                        kept_matricules.update(
+                            rejected['Matricule'].dropna().astype(str).str.strip()
+                            .str.replace(r'\.0+$', '', regex=True)
+                        )
+                elif new_rows:
+                    batch_inserted, batch_duplicates = self.bulk_insert_students(new_rows)
+                
+                for reason, count in rejected['reason'].value_counts().items():
+                    rejected_reasons[reason] += count
+                
+                file_duplicates = int((rejected['reason'] == DUPLICATE_IN_FILE_REASON).sum())
+                
+                success_count += batch_inserted
+                unchanged_count += len(unchanged_rows)
+                changed_count += len(changed_rows)
+                invalid_count += len(rejected) - file_duplicates
+                duplicate_count += batch_duplicates + len(repeated_rows) + file_duplicates
+                processed += len(batch)
+                
+                if progress_callback and total:
+                    progress_callback(min(processed / total, 1))
+            
+            removed_count = 0
+            if mode == 'sync':
+                _, removed_count = self.sync_students(
+                    sync_rows,
+                    remove_missing_groupe=groupe_name if remove_missing else None,
+                    keep_matricules=seen | kept_matricules
+                )
+            
+            error_count = invalid_count + duplicate_count
+            
+            if mode == 'sync':
+                message = (
+                    f"Sync complete: {success_count} new students added, "
+                    f"{changed_count} updated, {unchanged_count} unchanged"
+                )
+                if remove_missing:
+                    message += f", {removed_count} removed from {groupe_name}"
+            else:
+                message = (
+                    f"Import complete: {success_count} new students added, "
+                    f"{unchanged_count} unchanged, {changed_count} changed (not updated)"
+                )
+            if error_count > 0:
+                message += f", {error_count} errors ({invalid_count} invalid, {duplicate_count} duplicates)"
+            
+            logger.info(message)
+            for reason, count in rejected_reasons.items():
+                logger.info(f"Rejected rows - {reason}: {count}")
+            
+            self._record_import(file_path, fingerprint, groupe_name, mode, remove_missing, success_count)
+            
+            return True, message, success_count
+            
+        except Exception as e:
+            error_msg = f"Error reading import file: {str(e)}"
+            logger.error(error_msg)
+            return False, error_msg, 0
+        finally:
+            if source is not None:
+                source.close()
+    
+    def fingerprint_file(self, file_path):
+        """
+        Return (content_hash, size, mtime) for an import file. The SHA-256 is
+        read in Config.IMPORT_HASH_CHUNK_SIZE chunks; a ledger entry with the
+        same path, size and mtime (or an earlier call this session) is reused
+        instead of hashing again.
+        """
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        key = (file_path, stat.st_size, stat.st_mtime)
+        
+        with self._fingerprint_lock:
+            content_hash = self._fingerprints.get(key)
+        
+        if content_hash is None:
+            row = self._get_connection().execute('''
+                SELECT content_hash FROM import_ledger
+                WHERE file_path = ? AND file_size = ? AND file_mtime = ?
+                ORDER BY id DESC LIMIT 1
+            ''', key).fetchone()
+            
+            if row:
+                content_hash = row[0]
+            else:
+                digest = hashlib.sha256()
+                with open(file_path, 'rb') as import_file:
+                    for chunk in iter(lambda: import_file.read(Config.IMPORT_HASH_CHUNK_SIZE), b''):
+                        digest.update(chunk)
+                content_hash = digest.hexdigest()
+            
+            with self._fingerprint_lock:
+                self._fingerprints[key] = content_hash
+        
+        return content_hash, stat.st_size, stat.st_mtime
+    
+    def find_previous_import(self, file_path, groupe_name=None, mode='insert', remove_missing=False,
+                             all_sheets=False):
+        """
+        Latest ledger entry for a file with the same content, imported with the
+        same group, mode and sheet scope, as a dict (file_name, imported_at,
+        imported_count); None if there is none.
+        """
+        content_hash, _, _ = self.fingerprint_file(file_path)
+        
+        cursor = self._get_connection().cursor()
+        try:
+            cursor.execute('''
+                SELECT file_name, imported_at, imported_count FROM import_ledger
+                WHERE content_hash = ? AND groupe IS ? AND mode = ?
+                ORDER BY id DESC LIMIT 1
+            ''', (content_hash, groupe_name, self._ledger_mode(mode, remove_missing, all_sheets)))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        
+        if row is None:
+            return None
+        
+        return {'file_name': row[0], 'imported_at': row[1], 'imported_count': row[2]}
+    
+    def _ledger_mode(self, mode, remove_missing, all_sheets=False):
+        """
+        Mode as stored in import_ledger: 'insert', 'sync' or 'sync+remove',
+        or 'insert+sheets' / 'sync+sheets' when every sheet was imported
+        """
+        if remove_missing:
+            return 'sync+remove'
+        return f'{mode}+sheets' if all_sheets else mode
+    
+    def _record_import(self, file_path, fingerprint, groupe_name, mode, remove_missing, imported_count,
+                       all_sheets=False):
+        """Add a finished import to the ledger"""
+        content_hash, size, mtime = fingerprint
+        conn = self._get_connection()
+        
+        try:
+            conn.execute('''
+                INSERT INTO import_ledger
+                    (file_name, file_path, content_hash, file_size, file_mtime, groupe, mode, imported_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                os.path.basename(file_path), os.path.abspath(file_path), content_hash, size, mtime,
+                groupe_name, self._ledger_mode(mode, remove_missing, all_sheets), imported_count
+            ))
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Error recording import: {str(e)}")
+    
+    def import_files(self, file_paths, groupe_name=None, all_sheets=False, mode='insert',
+                     force=False, workers=None, progress_callback=None):
+        """
+        Import many files, and with all_sheets every sheet of each workbook.
+        Sheets are read and validated in parallel by a worker pool (default:
+        Config.IMPORT_WORKERS); this thread is the single writer and applies
+        them in file and sheet order. Without groupe_name or a Groupe column a
+        sheet's rows go to a groupe named after the sheet (all_sheets only).
+        Files already in the import ledger are skipped unless force is set.
+        progress_callback(value, file_name) follows the sheets written.
+        Returns (success, message, added_count).
+        """
+        if mode not in ('insert', 'sync'):
+            return False, f"Unknown import mode: {mode}", 0
+        
+        workers = workers or Config.IMPORT_WORKERS or os.cpu_count() or 1
+        
+        fingerprints = {}
+        sheets_left = {}
+        skipped = []
+        skipped_sheets = []
+        failures = []
+        jobs = []
+        
+        for file_path in dict.fromkeys(file_paths):
+            file_name = os.path.basename(file_path)
+            
+            try:
+                fingerprint = self.fingerprint_file(file_path)
+                if not force and self.find_previous_import(file_path, groupe_name, mode, all_sheets=all_sheets):
+                    skipped.append(file_name)
+                    continue
+                
+                sheet_names = list_import_sheets(file_path) if all_sheets else [None]
+            except Exception as e:
+                logger.error(f"Error opening {file_name}: {str(e)}")
+                failures.append(f"{file_name}: {str(e)}")
+                continue
+            
+            fingerprints[file_path] = fingerprint
+            sheets_left[file_path] = len(sheet_names)
+            jobs.extend((file_path, sheet_name) for sheet_name in sheet_names)
+        
+        if not jobs:
+            message = f"Nothing to import: {len(skipped)} files already imported"
+            if failures:
+                message = "Import failed:\n" + "\n".join(failures)
+            return not failures, message, 0
+        
+        seen = set()
+        
+        totals = defaultdict(int)
+        rejected_reasons = defaultdict(int)
+        added_per_file = defaultdict(int)
+        failed_files = set()
+        
+        with self._create_worker_pool(workers) as pool:
+            futures = [
+                pool.submit(
+                    parse_import_sheet, file_path, sheet_name,
+                    groupe_name, sheet_name if all_sheets else None
+                )
+                for file_path, sheet_name in jobs
+            ]
+            
+            # Results are written in submission order while later sheets still parse
+            for index, ((file_path, sheet_name), future) in enumerate(zip(jobs, futures)):
+                label = os.path.basename(file_path) + (f" [{sheet_name}]" if sheet_name else "")
+                
+                try:
+                    rows, reasons, processed = future.result()
+                    
+                    new_rows, unchanged_rows, changed_rows, repeated_rows = self._split_import_rows(
+                        rows, seen
+                    )
+                    
+                    inserted, duplicates = 0, 0
+                    if mode == 'sync':
+                        if new_rows or changed_rows:
+                            self.sync_students(new_rows + changed_rows)
+                        inserted = len(new_rows)
+                    elif new_rows:
+                        inserted, duplicates = self.bulk_insert_students(new_rows)
+                    
+                    totals['added'] += inserted
+                    totals['unchanged'] += len(unchanged_rows)
+                    totals['changed'] += len(changed_rows)
+                    file_duplicates = reasons.get(DUPLICATE_IN_FILE_REASON, 0)
+                    totals['duplicates'] += duplicates + len(repeated_rows) + file_duplicates
+                    totals['invalid'] += sum(reasons.values()) - file_duplicates
+                    for reason, count in reasons.items():
+                        rejected_reasons[reason] += count
+                    added_per_file[file_path] += inserted
+                    
+                except MissingColumnsError as e:
+                    # Workbooks often carry extra sheets (summaries, notes)
+                    if not all_sheets:
+                        failures.append(f"{label}: {str(e)}")
+                        failed_files.add(file_path)
+                    else:
+                        skipped_sheets.append(label)
+                except Exception as e:
+                    logger.error(f"Error importing {label}: {str(e)}")
+                    failures.append(f"{label}: {str(e)}")
+                    failed_files.add(file_path)
+                
+                sheets_left[file_path] -= 1
+                if sheets_left[file_path] == 0 and file_path not in failed_files:
+                    self._record_import(
+                        file_path, fingerprints[file_path], groupe_name, mode, False,
+                        added_per_file[file_path], all_sheets
+                    )
+                
+                if progress_callback:
+                    progress_callback((index + 1) / len(jobs), label)
+        
+        imported_files = len(fingerprints) - len(failed_files)
+        
+        message = (
+            f"Imported {imported_files} files ({len(jobs)} sheets): "
+            f"{totals['added']} new students added, {totals['unchanged']} unchanged, "
+            f"{totals['changed']} {'updated' if mode == 'sync' else 'changed (not updated)'}"
+        )
+        error_count = totals['invalid'] + totals['duplicates']
+        if error_count > 0:
+            message += f", {error_count} errors ({totals['invalid']} invalid, {totals['duplicates']} duplicates)"
+        if skipped:
+            message += f"\n{len(skipped)} files already imported: {', '.join(skipped)}"
+        if skipped_sheets:
+            message += f"\n{len(skipped_sheets)} sheets without student columns skipped"
+        if failures:
+            message += "\nFailed:\n" + "\n".join(failures)
+        
+        logger.info(message)
+        for reason, count in rejected_reasons.items():
+            logger.info(f"Rejected rows - {reason}: {count}")
+        
+        return imported_files > 0, message, totals['added']
+    
+    def _load_existing_students(self, matricules):
+        """
+        Map the given matricules that are already stored to their
+        (nom, prenom, section, groupe), through the matricule index in
+        chunks of Config.IMPORT_LOOKUP_CHUNK_SIZE
+        """
+        matricules = list(matricules)
+        existing = {}
+        
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            for start in range(0, len(matricules), Config.IMPORT_LOOKUP_CHUNK_SIZE):
+                chunk = matricules[start:start + Config.IMPORT_LOOKUP_CHUNK_SIZE]
+                placeholders = ', '.join('?' * len(chunk))
+                cursor.execute(f'''
+                    SELECT matricule, nom, prenom, section, groupe FROM students
+                    WHERE matricule IN ({placeholders})
+                ''', chunk)
+                existing.update((row[0], row[1:]) for row in cursor)
+            
+            return existing
+        finally:
+            cursor.close()
+    
+    def _split_import_rows(self, rows, seen):
+        """
+        Split (matricule, nom, prenom, section, groupe) rows against the
+        stored students into (new, unchanged, changed, repeated) lists; only
+        this batch's matricules are looked up, so the cost follows the file,
+        not the table. Repeated rows reuse a matricule from an earlier batch
+        of the same file. Adds the matricules of the other rows to seen.
+        """
+        new_rows, unchanged_rows, changed_rows, repeated_rows = [], [], [], []
+        existing = self._load_existing_students(
+            row[0] for row in rows if row[0] not in seen
+        )
+        
+        for row in rows:
+            matricule = row[0]
+            
+            if matricule in seen:
+                repeated_rows.append(row)
+                continue
+            seen.add(matricule)
+            
+            stored = existing.get(matricule)
+            if stored is None:
+                new_rows.append(row)
+            elif stored == row[1:]:
+                unchanged_rows.append(row)
+            else:
+                changed_rows.append(row)
+        
+        return new_rows, unchanged_rows, changed_rows, repeated_rows
+    
+    def bulk_insert_students(self, rows, progress_callback=None, total=None):
+        """
+        Insert (matricule, nom, prenom, section, groupe) rows with executemany,
+        committing every Config.IMPORT_CHUNK_SIZE rows.
+        Existing matricules are skipped. Returns (inserted_count, duplicate_count).
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        if total is None and hasattr(rows, '__len__'):
+            total = len(rows)
+        
+        inserted_count = 0
+        processed = 0
+        rows = iter(rows)
+        
+        try:
+            while True:
+                chunk = list(islice(rows, Config.IMPORT_CHUNK_SIZE))
+                if not chunk:
+                    break
+                
+                # rowcount sums the rows each statement inserted; unlike
+                # total_changes it leaves out rows written by triggers
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO students (matricule, nom, prenom, section, groupe)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', chunk)
+                chunk_inserted = cursor.rowcount
+                conn.commit()
+                
+                if chunk_inserted:
+                    self._mark_students_changed()
+                
+                inserted_count += chunk_inserted
+                processed += len(chunk)
+                
+                if progress_callback and total:
+                    progress_callback(min(processed / total, 1))
+            
+            logger.info(f"Bulk insert: {inserted_count} of {processed} rows inserted")
+            return inserted_count, processed - inserted_count
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Bulk insert error: {str(e)}")
+            raise
+        finally:
+            cursor.close()
+    
+    def sync_students(self, rows, remove_missing_groupe=None, keep_matricules=()):
+        """
+        Apply (matricule, nom, prenom, section, groupe) rows in one transaction:
+        unknown matricules are inserted, stored ones are updated only where a
+        column differs, so updated_at moves only on real changes. With
+        remove_missing_groupe, that groupe's students whose matricule is not in
+        keep_matricules are deleted in one statement.
+        Returns (written_count, removed_count).
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            if remove_missing_groupe:
+                cursor.execute(
+                    "CREATE TEMP TABLE IF NOT EXISTS import_matricules (matricule TEXT PRIMARY KEY)"
+                )
+            
+            cursor.executemany('''
+                INSERT INTO students (matricule, nom, prenom, section, groupe)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(matricule) DO UPDATE SET
+                    nom = excluded.nom,
+                    prenom = excluded.prenom,
+                    section = excluded.section,
+                    groupe = excluded.groupe,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE students.nom IS NOT excluded.nom
+                   OR students.prenom IS NOT excluded.prenom
+                   OR students.section IS NOT excluded.section
+                   OR students.groupe IS NOT excluded.groupe
+            ''', rows)
+            written_count = max(cursor.rowcount, 0)
+            
+            removed_count = 0
+            if remove_missing_groupe:
+                cursor.execute("DELETE FROM temp.import_matricules")
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO temp.import_matricules (matricule) VALUES (?)",
+                    ((matricule,) for matricule in keep_matricules)
+                )
+                cursor.execute('''
+                    DELETE FROM students
+                    WHERE groupe = ?
+                      AND matricule NOT IN (SELECT matricule FROM temp.import_matricules)
+                ''', (remove_missing_groupe,))
+                removed_count = cursor.rowcount
+                cursor.execute("DELETE FROM temp.import_matricules")
+            
+            conn.commit()
+            
+            if written_count or removed_count:
+                self._mark_students_changed()
+            
+            logger.info(f"Sync: {written_count} students written, {removed_count} removed")
+            return written_count, removed_count
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Sync error: {str(e)}")
+            raise
+        finally:
+            cursor.close()
+    
+    def export_students(self, output_path, groupe=None, progress_callback=None, cancel_event=None):
+        """
+        Export students as Excel, CSV or Parquet, picked by output_path's extension.
+        Setting cancel_event (a threading.Event) stops the export at the next
+        chunk and removes the partial file.
+        """
+        extension = os.path.splitext(output_path)[1].lower()
+        
+        if extension == '.csv':
+            return self.export_to_csv(output_path, groupe, progress_callback, cancel_event)
+        if extension == '.parquet':
+            return self.export_to_parquet(output_path, groupe, progress_callback, cancel_event)
+        
+        return self.export_to_excel(output_path, groupe, progress_callback, cancel_event=cancel_event)
+    
+    def export_all_groupes(self, output_folder, extension='.xlsx', workers=None, progress_callback=None,
+                           cancel_event=None):
+        """
+        Export one file per group, fanned out to a pool of workers that each
+        open their own read-only connection (default: Config.EXPORT_WORKERS).
+        Progress is the share of students in the groups finished so far.
+        Setting cancel_event drops the groups not started yet, stops thread
+        workers at their next chunk and removes every file of the run.
+        Returns (success, message, paths).
+        """
+        groupe_counts = self.get_groupe_counts()
+        if not groupe_counts:
+            return False, "No groups to export", []
+        
+        os.makedirs(output_folder, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        workers = workers or Config.EXPORT_WORKERS or os.cpu_count() or 1
+        
+        # Biggest groups first so one large group doesn't finish last alone
+        groupe_counts = sorted(groupe_counts, key=lambda item: item[1], reverse=True)
+        total = sum(count for _, count in groupe_counts)
+        
+        done = 0
+        paths = []
+        failures = []
+        
+        with self._create_worker_pool(workers) as pool:
+            # A threading.Event can't reach forked workers; those finish the
+            # group they are on and their file is removed afterwards
+            worker_cancel_event = None if isinstance(pool, ProcessPoolExecutor) else cancel_event
+            
+            futures = {}
+            used_names = set()
+            for groupe, count in groupe_counts:
+                # Names like 'G 1' and 'G_1' sanitise alike; number the repeats
+                # (compared case-insensitively for FAT/exFAT storage)
+                safe_name = re.sub(r'[^\w.-]', '_', groupe)
+                file_name = f"export_{safe_name}_{timestamp}"
+                suffix = 1
+                while file_name.lower() in used_names:
+                    suffix += 1
+                    file_name = f"export_{safe_name}_{timestamp}_{suffix}"
+                used_names.add(file_name.lower())
+                
+                output_path = os.path.join(output_folder, file_name + extension)
+                future = pool.submit(export_groupe_file, self.db_name, groupe, output_path, worker_cancel_event)
+                futures[future] = (groupe, count, output_path)
+            
+            for future in as_completed(futures):
+                if cancel_event is not None and cancel_event.is_set():
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    for _, _, output_path in futures.values():
+                        if os.path.exists(output_path):
+                            os.remove(output_path)
+                    
+                    logger.info(f"Export of all groups cancelled: {output_folder}")
+                    return False, "Export cancelled", []
+                
+                groupe, count, output_path = futures[future]
+                
+                try:
+                    success, message = future.result()
+                except Exception as e:
+                    success, message = False, str(e)
+                
+                if success:
+                    paths.append(output_path)
+                else:
+                    failures.append(groupe)
+                    logger.error(f"Export of group {groupe} failed: {message}")
+                
+                done += count
+                if progress_callback and total:
+                    progress_callback(done / total)
+        
+        message = f"Exported {len(paths)} of {len(groupe_counts)} groups to {output_folder}"
+        if failures:
+            message += f"\nFailed: {', '.join(sorted(failures))}"
+        
+        logger.info(message)
+        return not failures, message, paths
+    
+    def _create_worker_pool(self, workers):
+        """
+        Process pool where fork is safe: desktop Linux, and only while no
+        thread other than the caller and the main thread (idle behind the
+        progress popup) is alive. A backup or import thread could be holding
+        a SQLite or logging lock that the child would inherit locked forever.
+        Children only run the export or parse job. Everywhere else fall back
+        to threads: Android has no working multiprocessing, and spawn or
+        forkserver children (macOS, Windows) would re-import the Kivy app.
+        """
+        other_threads = [
+            thread.name for thread in threading.enumerate()
+            if thread is not threading.current_thread() and thread is not threading.main_thread()
+        ]
+        if other_threads:
+            logger.info(f"Threads running ({', '.join(other_threads)}), using a thread pool")
+        elif platform == 'linux' and 'fork' in multiprocessing.get_all_start_methods():
+            try:
+                return ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('fork')
+                )
+            except (OSError, NotImplementedError, ImportError) as e:
+                logger.warning(f"Process pool unavailable, using threads: {str(e)}")
+        
+        return ThreadPoolExecutor(max_workers=workers)
+    
+    def export_to_excel(self, output_path, groupe=None, progress_callback=None, streaming=None, cancel_event=None):
+        """
+        Export students to Excel file.
+        With streaming (default: Config.EXPORT_STREAMING) rows are fetched in
+        Config.EXPORT_CHUNK_SIZE chunks and written through openpyxl's
+        write-only workbook, so memory stays flat as the export grows.
+        The pandas path only honours cancel_event once it has finished writing.
+        """
+        if streaming is None:
+            streaming = Config.EXPORT_STREAMING
+        
+        try:
+            if streaming:
+                exported = self._write_excel_stream(output_path, groupe, progress_callback, cancel_event)
+            else:
+                exported = self._write_excel_frame(output_path, groupe)
+                self._check_export_cancelled(cancel_event)
+            
+            logger.info(f"Exported {exported} students to: {output_path}")
+            return True, f"Data exported successfully to {output_path}"
+            
+        except ExportCancelled:
+            return self._cancel_export(output_path)
+        except Exception as e:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            logger.error(f"Excel export error: {str(e)}")
+            return False, f"Error exporting to Excel: {str(e)}"
+    
+    def _write_excel_frame(self, output_path, groupe=None):
+        """Read the whole result with pandas and write it in one go; returns the row count"""
+        conn = self._get_connection()
+        
+        if groupe:
+            query = "SELECT * FROM students WHERE groupe = ? ORDER BY nom, prenom"
+            df = pd.read_sql_query(query, conn, params=(groupe,))
+        else:
+            query = "SELECT * FROM students ORDER BY nom, prenom"
+            df = pd.read_sql_query(query, conn)
+        
+        # Save to Excel
+        df.to_excel(output_path, index=False, sheet_name='Students')
+        
+        return len(df)
+    
+    def _write_excel_stream(self, output_path, groupe=None, progress_callback=None, cancel_event=None):
+        """
+        Write the 'Students' sheet row by row with a write-only workbook;
+        returns the row count. Same columns and header as the pandas path.
+        """
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        total = self.count_students(groupe=groupe)
+        exported = 0
+        
+        try:
+            if groupe:
+                cursor.execute("SELECT * FROM students WHERE groupe = ? ORDER BY nom, prenom", (groupe,))
+            else:
+                cursor.execute("SELECT * FROM students ORDER BY nom, prenom")
+            
+            workbook = Workbook(write_only=True)
+            worksheet = workbook.create_sheet('Students')
+            
+            header_font = Font(bold=True)
+            header = []
+            for column in cursor.description:
+                cell = WriteOnlyCell(worksheet, value=column[0])
+                cell.font = header_font
+                header.append(cell)
+            worksheet.append(header)
+            
+            try:
+                while True:
+                    self._check_export_cancelled(cancel_event)
+                    
+                    rows = cursor.fetchmany(Config.EXPORT_CHUNK_SIZE)
+                    if not rows:
+                        break
+                    
+                    for row in rows:
+                        worksheet.append(row)
+                    
+                    exported += len(rows)
+                    if progress_callback and total:
+                        progress_callback(min(exported / total, 1))
+                
+                self._check_export_cancelled(cancel_event)
+            except ExportCancelled:
+                # Finish the sheet's temporary XML so openpyxl can clean it up
+                worksheet.close()
+                raise
+            
+            workbook.save(output_path)
+            
+        finally:
+            cursor.close()
+        
+        return exported
+    
+    def export_to_csv(self, output_path, groupe=None, progress_callback=None, cancel_event=None):
+        """
+        Stream students to a UTF-8 CSV file with the import headers
+        (Config.INTERCHANGE_COLUMNS), so the file can be imported again.
+        """
+        try:
+            exported = 0
+            
+            # The BOM lets Excel detect UTF-8 (accented names)
+            with open(output_path, 'w', encoding='utf-8-sig', newline='') as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerow(Config.INTERCHANGE_COLUMNS.values())
+                
+                for rows in self._iter_export_chunks(
+                    groupe, Config.EXPORT_CHUNK_SIZE, progress_callback, cancel_event
+                ):
+                    writer.writerows(rows)
+                    exported += len(rows)
+            
+            logger.info(f"Exported {exported} students to: {output_path}")
+            return True, f"Data exported successfully to {output_path}"
+            
+        except ExportCancelled:
+            return self._cancel_export(output_path)
+        except Exception as e:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            logger.error(f"CSV export error: {str(e)}")
+            return False, f"Error exporting to CSV: {str(e)}"
+    
+    def export_to_parquet(self, output_path, groupe=None, progress_callback=None, cancel_event=None):
+        """
+        Write students to a Parquet file with the import headers
+        (Config.INTERCHANGE_COLUMNS), one row group per
+        Config.PARQUET_ROW_GROUP_SIZE rows.
+        """
+        if pq is None:
+            return False, "Parquet export needs the pyarrow package"
+        
+        try:
+            exported = 0
+            schema = pa.schema([(name, pa.string()) for name in Config.INTERCHANGE_COLUMNS.values()])
+            
+            with pq.ParquetWriter(output_path, schema) as writer:
+                for rows in self._iter_export_chunks(
+                    groupe, Config.PARQUET_ROW_GROUP_SIZE, progress_callback, cancel_event
+                ):
+                    columns = list(zip(*rows))
+                    writer.write_table(pa.Table.from_arrays(
+                        [pa.array(values, type=pa.string()) for values in columns],
+                        schema=schema
+                    ))
+                    exported += len(rows)
+            
+            logger.info(f"Exported {exported} students to: {output_path}")
+            return True, f"Data exported successfully to {output_path}"
+            
+        except ExportCancelled:
+            return self._cancel_export(output_path)
+        except Exception as e:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            logger.error(f"Parquet export error: {str(e)}")
+            return False, f"Error exporting to Parquet: {str(e)}"
+    
+    def _iter_export_chunks(self, groupe=None, chunk_size=Config.EXPORT_CHUNK_SIZE,
+                            progress_callback=None, cancel_event=None):
+        """Yield lists of Config.INTERCHANGE_COLUMNS tuples, ordered by name, reporting progress"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        total = self.count_students(groupe=groupe)
+        exported = 0
+        columns = ', '.join(Config.INTERCHANGE_COLUMNS)
+        
+        try:
+            if groupe:
+                cursor.execute(f"SELECT {columns} FROM students WHERE groupe = ? ORDER BY nom, prenom", (groupe,))
+            else:
+                cursor.execute(f"SELECT {columns} FROM students ORDER BY nom, prenom")
+            
+            while True:
+                self._check_export_cancelled(cancel_event)
+                
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                
+                yield rows
+                
+                exported += len(rows)
+                if progress_callback and total:
+                    progress_callback(min(exported / total, 1))
+            
+            self._check_export_cancelled(cancel_event)
+        finally:
+            cursor.close()
+    
+    def _check_export_cancelled(self, cancel_event):
+        """Raise ExportCancelled if the export's cancel event is set"""
+        if cancel_event is not None and cancel_event.is_set():
+            raise ExportCancelled()
+    
+    def _cancel_export(self, output_path):
+        """Remove a cancelled export's partial file; returns the (success, message) result"""
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        
+        logger.info(f"Export cancelled: {output_path}")
+        return False, "Export cancelled"
+    
+    def backup_database(self, progress_callback=None, wait=False):
+        """
+        Create a consistent online backup with SQLite's backup API.
+        Pages are copied in Config.BACKUP_PAGES_PER_STEP steps from a dedicated
+        connection that holds one read transaction, so the copy is a single WAL
+        snapshot and concurrent writers neither block it nor force restarts.
+        The snapshot becomes the base of a new incremental backup chain.
+        """
+        if not self._backup_lock.acquire(blocking=wait):
+            return False, "A backup is already running"
+        
+        try:
+            return self._write_full_backup(progress_callback)
+            
+        except Exception as e:
+            logger.error(f"Backup error: {str(e)}")
+            return False, f"Backup failed: {str(e)}"
+        finally:
+            self._backup_lock.release()
+    
+    def backup_incremental(self, progress_callback=None, wait=False):
+        """
+        Write only the rows changed since the last backup as a delta file next
+        to the current base snapshot. Falls back to a full backup when there is
+        no usable base or the chain already has Config.BACKUP_MAX_DELTAS deltas.
+        """
+        if not self._backup_lock.acquire(blocking=wait):
+            return False, "A backup is already running"
+        
+        try:
+            if not self.changelog_enabled:
+                return self._write_full_backup(progress_callback)
+            
+            state = self._get_backup_state()
+            base_backup = state.get('base_backup')
+            
+            if (base_backup is None
+                    or not os.path.exists(os.path.join(self.get_backup_folder(), base_backup))
+                    or int(state.get('delta_count', 0)) >= Config.BACKUP_MAX_DELTAS):
+                return self._write_full_backup(progress_callback)
+            
+            return self._write_delta_backup(state, progress_callback)
+            
+        except Exception as e:
+            logger.error(f"Incremental backup error: {str(e)}")
+            return False, f"Backup failed: {str(e)}"
+        finally:
+            self._backup_lock.release()
+    
+    def _write_full_backup(self, progress_callback=None):
+        """
+        Copy the whole database to a new base snapshot (caller holds _backup_lock).
+        With Config.BACKUP_COMPRESSION the snapshot is taken into a local
+        temporary file and streamed through the compressor into the backup
+        folder, next to a manifest holding the snapshot's size and SHA-256.
+        """
+        codec = self._get_backup_codec()
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        backup_filename = f"backup_{timestamp}{self.BACKUP_SUFFIXES[codec]}"
+        
+        backup_folder = self.get_backup_folder()
+        os.makedirs(backup_folder, exist_ok=True)
+        backup_path = os.path.join(backup_folder, backup_filename)
+        
+        # The page copy is the first half of the progress bar when compressing
+        copy_share = 0.5 if codec else 1.0
+        
+        def report_progress(status, remaining, total):
+            if progress_callback and total:
+                progress_callback((total - remaining) / total * copy_share)
+        
+        def report_compress_progress(value):
+            if progress_callback:
+                progress_callback(copy_share + value * (1 - copy_share))
+        
+        if codec:
+            # Page-sized writes are slow on shared storage; keep them local
+            fd, snapshot_path = tempfile.mkstemp(prefix='backup_', suffix='.db')
+            os.close(fd)
+        else:
+            snapshot_path = backup_path
+        
+        # Read before the snapshot so later commits count as changes
+        data_version = self._get_data_version()
+        
+        try:
+            source_conn = sqlite3.connect(
+                self.db_name,
+                timeout=self.pragmas['busy_timeout'] / 1000,
+                isolation_level=None
+            )
+            backup_conn = sqlite3.connect(snapshot_path)
+            try:
+                # Pin a read snapshot for the whole copy
+                source_conn.execute("BEGIN")
+                snapshot_seq = self._get_change_seq(source_conn)
+                
+                source_conn.backup(
+                    backup_conn,
+                    pages=Config.BACKUP_PAGES_PER_STEP,
+                    progress=report_progress
+                )
+                source_conn.execute("COMMIT")
+                
+                # Leave a single self-contained file rather than a WAL database
+                backup_conn.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                backup_conn.close()
+                source_conn.close()
+            
+            size, checksum = self._compress_backup(
+                snapshot_path, backup_path, codec, report_compress_progress
+            )
+        finally:
+            if codec and os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+        
+        manifest = {
+            'file': backup_filename,
+            'codec': codec or 'none',
+            'size': size,
+            'compressed_size': os.path.getsize(backup_path),
+            'sha256': checksum
+        }
+        with open(self._get_manifest_path(backup_path), 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        
+        self._last_backup_version = data_version
+        
+        # Changes after the snapshot stay in the log for the first delta
+        if self.changelog_enabled:
+            self._advance_backup_state(snapshot_seq, {
+                'base_backup': backup_filename,
+                'backed_up_seq': snapshot_seq,
+                'delta_count': 0
+            })
+        
+        logger.info(
+            f"Database backed up to: {backup_path} "
+            f"({manifest['compressed_size']} of {size} bytes, {manifest['codec']})"
+        )
+        return True, backup_path
+    
+    def _get_backup_codec(self):
+        """Compression codec for new snapshots: 'zstd', 'gzip' or None"""
+        codec = Config.BACKUP_COMPRESSION
+        
+        if codec == 'zstd' and zstandard is None:
+            return 'gzip'
+        
+        if codec not in self.BACKUP_SUFFIXES:
+            logger.warning(f"Unknown backup compression '{codec}', using gzip")
+            return 'gzip'
+        
+        return codec
+    
+    def _get_manifest_path(self, backup_path):
+        """Manifest that sits next to a full snapshot: backup_<timestamp>.manifest.json"""
+        match = re.match(r'(.*backup_\d{8}_\d{6})\.db', backup_path)
+        return match.group(1) + '.manifest.json'
+    
+    def _compress_backup(self, source_path, backup_path, codec, progress_callback=None):
+        """
+        Stream source_path through the codec into backup_path in
+        Config.BACKUP_STREAM_CHUNK_SIZE chunks. Returns (size, sha256) of the
+        uncompressed data. With no codec source_path already is the backup
+        and is only hashed.
+        """
+        digest = hashlib.sha256()
+        total = os.path.getsize(source_path)
+        done = 0
+        
+        if codec is None:
+            with open(source_path, 'rb') as source:
+                for chunk in iter(lambda: source.read(Config.BACKUP_STREAM_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            return total, digest.hexdigest()
+        
+        level = Config.BACKUP_COMPRESSION_LEVELS[codec]
+        temp_path = backup_path + '.tmp'
+        
+        try:
+            with open(source_path, 'rb') as source, open(temp_path, 'wb') as target:
+                if codec == 'zstd':
+                    writer = zstandard.ZstdCompressor(level=level).stream_writer(
+                        target, size=total, closefd=False
+                    )
+                else:
+                    writer = gzip.GzipFile(fileobj=target, mode='wb', compresslevel=level)
+                
+                with writer:
+                    for chunk in iter(lambda: source.read(Config.BACKUP_STREAM_CHUNK_SIZE), b''):
+                        digest.update(chunk)
+                        writer.write(chunk)
+                        
+                        done += len(chunk)
+                        if progress_callback and total:
+                            progress_callback(done / total)
+                
+                target.flush()
+                os.fsync(target.fileno())
+            
+            os.replace(temp_path, backup_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        return total, digest.hexdigest()
+    
+    def _extract_backup(self, backup_path, output_path):
+        """
+        Stream-decompress a full snapshot (.db, .db.gz or .db.zst) into
+        output_path and check it against its manifest when there is one.
+        """
+        if backup_path.endswith('.zst'):
+            if zstandard is None:
+                raise ValueError("zstandard is required to restore .zst backups")
+            source = zstandard.ZstdDecompressor().stream_reader(open(backup_path, 'rb'), closefd=True)
+        elif backup_path.endswith('.gz'):
+            source = gzip.open(backup_path, 'rb')
+        else:
+            source = open(backup_path, 'rb')
+        
+        digest = hashlib.sha256()
+        size = 0
+        
+        with source, open(output_path, 'wb') as target:
+            for chunk in iter(lambda: source.read(Config.BACKUP_STREAM_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                target.write(chunk)
+                size += len(chunk)
+        
+        manifest_path = self._get_manifest_path(backup_path)
+        if not os.path.exists(manifest_path):
+            # Raw snapshots from before manifests were written
+            logger.warning(f"No manifest for {os.path.basename(backup_path)}, skipping checksum")
+            return
+        
+        with open(manifest_path, encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+        
+        if size != manifest['size'] or digest.hexdigest() != manifest['sha256']:
+            raise ValueError(f"Checksum mismatch for {os.path.basename(backup_path)}")
+    
+    def _write_delta_backup(self, state, progress_callback=None):
+        """
+        Write the change_log entries after backed_up_seq to
+        backup_<base timestamp>_delta_<to_seq>.jsonl: a header line, then one
+        JSON object per changed row (caller holds _backup_lock).
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            from_seq = int(state['backed_up_seq'])
+            cursor.execute("SELECT MAX(seq) FROM change_log")
+            to_seq = cursor.fetchone()[0]
+            
+            if to_seq is None or to_seq <= from_seq:
+                return True, "No changes since last backup"
+            
+            base_backup = state['base_backup']
+            base_timestamp = re.match(r'backup_(\d{8}_\d{6})', base_backup).group(1)
+            delta_filename = f"backup_{base_timestamp}_delta_{to_seq:010d}.jsonl"
+            delta_path = os.path.join(self.get_backup_folder(), delta_filename)
+            temp_path = delta_path + '.tmp'
+            
+            cursor.execute('''
+                SELECT seq, table_name, operation, row_id, row_data FROM change_log
+                WHERE seq > ? AND seq <= ?
+                ORDER BY seq
+            ''', (from_seq, to_seq))
+            
+            total = to_seq - from_seq
+            written = 0
+            
+            with open(temp_path, 'w', encoding='utf-8') as delta_file:
+                delta_file.write(json.dumps({
+                    'base': base_backup,
+                    'from_seq': from_seq,
+                    'to_seq': to_seq
+                }) + '\n')
+                
+                while True:
+                    entries = cursor.fetchmany(Config.IMPORT_CHUNK_SIZE)
+                    if not entries:
+                        break
+                    
+                    for seq, table_name, operation, row_id, row_data in entries:
+                        delta_file.write(json.dumps({
+                            'seq': seq,
+                            'table': table_name,
+                            'op': operation,
+                            'id': row_id,
+                            'data': json.loads(row_data) if row_data else None
+                        }, ensure_ascii=False) + '\n')
+                    
+                    written += len(entries)
+                    if progress_callback:
+                        progress_callback(min(written / total, 1.0))
+            
+            os.replace(temp_path, delta_path)
+            
+        finally:
+            cursor.close()
+        
+        self._advance_backup_state(to_seq, {
+            'backed_up_seq': to_seq,
+            'delta_count': int(state.get('delta_count', 0)) + 1
+        })
+        
+        logger.info(f"Incremental backup of {written} changes written to: {delta_path}")
+        return True, delta_path
+    
+    def _get_change_seq(self, conn=None):
+        """Sequence number of the newest change_log entry (0 if none yet)"""
+        conn = conn or self._get_connection()
+        row = conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'change_log'"
+        ).fetchone()
+        return row[0] if row else 0
+    
+    def _get_backup_state(self):
+        """Backup chain bookkeeping as a dict (base_backup, backed_up_seq, delta_count)"""
+        conn = self._get_connection()
+        return dict(conn.execute("SELECT key, value FROM backup_state").fetchall())
+    
+    def _advance_backup_state(self, backed_up_seq, values):
+        """Store the new chain state and drop change_log entries already backed up"""
+        conn = self._get_connection()
+        
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO backup_state (key, value) VALUES (?, ?)",
+                [(key, str(value)) for key, value in values.items()]
+            )
+            conn.execute("DELETE FROM change_log WHERE seq <= ?", (backed_up_seq,))
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+    
+    def restore_backup(self, base_path, output_path=None):
+        """
+        Rebuild a database from a full snapshot and the deltas of its chain.
+        The snapshot is stream-decompressed into a temporary file and checked
+        against its manifest, every delta is replayed in
+        sequence order and the result is integrity-checked before it replaces
+        output_path (default: the live database, whose connections are closed).
+        """
+        base_filename = os.path.basename(base_path)
+        match = re.match(r'backup_(\d{8}_\d{6})\.db(\.gz|\.zst)?$', base_filename)
+        if not match:
+            return False, f"Not a full backup: {base_filename}"
+        
+        backup_folder = os.path.dirname(base_path) or '.'
+        delta_pattern = re.compile(rf'backup_{match.group(1)}_delta_(\d+)\.jsonl$')
+        deltas = []
+        for filename in os.listdir(backup_folder):
+            delta_match = delta_pattern.match(filename)
+            if delta_match:
+                deltas.append((int(delta_match.group(1)), filename))
+        deltas.sort()
+        
+        target_path = output_path or self.db_name
+        temp_path = target_path + '.restore'
+        
+        # Wait for a running backup so it cannot copy a half-restored database
+        self._backup_lock.acquire()
+        
+        try:
+            self._extract_backup(base_path, temp_path)
+            
+            conn = sqlite3.connect(temp_path)
+            try:
+                # Keep the trigger-maintained tables in sync while replaying
+                conn.execute("PRAGMA recursive_triggers = ON")
+                expected_seq = self._get_change_seq(conn)
+                replayed = 0
+                
+                for _, filename in deltas:
+                    with open(os.path.join(backup_folder, filename), encoding='utf-8') as delta_file:
+                        header = json.loads(delta_file.readline())
+                        if header['from_seq'] != expected_seq:
+                            raise ValueError(
+                                f"Backup chain broken at {filename}: "
+                                f"expected changes after {expected_seq}, found {header['from_seq']}"
+                            )
+                        
+                        for line in delta_file:
+                            self._replay_change(conn, json.loads(line))
+                            replayed += 1
+                        
+                        expected_seq = header['to_seq']
+                
+                # The restored database starts a fresh chain
+                conn.execute("DELETE FROM change_log")
+                conn.execute("DELETE FROM backup_state")
+                conn.commit()
+                
+                result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+                if result != 'ok':
+                    raise ValueError(f"Integrity check failed: {result}")
+            finally:
+                conn.close()
+            
+            if output_path is None:
+                self.close()
+                for suffix in ('-wal', '-shm'):
+                    if os.path.exists(target_path + suffix):
+                        os.remove(target_path + suffix)
+            
+            os.replace(temp_path, target_path)
+            self._mark_students_changed()
+            
+            logger.info(f"Restored {base_filename} with {len(deltas)} deltas ({replayed} changes) to: {target_path}")
+            return True, f"Restored {base_filename} with {len(deltas)} incremental backups ({replayed} changes)"
+            
+        except Exception as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            logger.error(f"Restore error: {str(e)}")
+            return False, f"Restore failed: {str(e)}"
+        finally:
+            self._backup_lock.release()
+    
+    def _replay_change(self, conn, entry):
+        """Apply one change_log entry: upsert the row image, or delete by id"""
+        table = entry['table']
+        if table not in Config.CHANGELOG_TABLES:
+            raise ValueError(f"Unknown table in backup: {table}")
+        
+        if entry['op'] == 'DELETE':
+            conn.execute(f"DELETE FROM {table} WHERE id = ?", (entry['id'],))
+            return
+        
+        # Upsert rather than REPLACE so updates fire UPDATE triggers, not DELETE+INSERT
+        columns = list(entry['data'])
+        updates = ', '.join(f"{column} = excluded.{column}" for column in columns if column != 'id')
+        conn.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}",
+            [entry['data'][column] for column in columns]
+        )
+    
+    def get_backup_folder(self):
+        """Folder that holds the database backups"""
+        if platform == 'android':
+            storage_path = get_external_storage_path()
+            return os.path.join(storage_path, 'StudentTrackerPro', Config.BACKUP_FOLDER)
+        
+        return Config.BACKUP_FOLDER
+    
+    def get_export_folder(self):
+        """Folder that holds exported student files"""
+        if platform == 'android':
+            storage_path = get_external_storage_path()
+            return os.path.join(storage_path, 'StudentTrackerPro', Config.EXPORT_FOLDER)
+        
+        return Config.EXPORT_FOLDER
+    
+    def _get_data_version(self):
+        """Current PRAGMA data_version as seen by the watcher connection"""
+        with self._watch_lock:
+            if self._watch_conn is None:
+                return None
+            return self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+    
+    def has_changes_since_backup(self):
+        """
+        True if the change log has entries newer than the last backup. Without
+        a change log, true if anything was committed since this session's last
+        full backup (PRAGMA data_version).
+        """
+        if not self.changelog_enabled:
+            if self._last_backup_version is None:
+                return True
+            return self._get_data_version() != self._last_backup_version
+        
+        backed_up_seq = self._get_backup_state().get('backed_up_seq')
+        if backed_up_seq is None:
+            return True
+        
+        return self._get_change_seq() > int(backed_up_seq)
+    
+    def prune_backups(self):
+        """
+        Apply the retention policy: keep the newest full backup of each of the
+        last Config.BACKUP_KEEP_HOURLY hours and Config.BACKUP_KEEP_DAILY days.
+        Incremental backups and manifests are kept exactly when their base
+        snapshot is. Returns the number of files removed.
+        """
+        backup_folder = self.get_backup_folder()
+        if not os.path.isdir(backup_folder):
+            return 0
+        
+        backups = []
+        deltas = []
+        for filename in os.listdir(backup_folder):
+            match = re.match(
+                r'backup_(\d{8}_\d{6})(_delta_\d+\.jsonl|\.manifest\.json|\.db(?:\.gz|\.zst)?)$',
+                filename
+            )
+            if not match:
+                continue
+            
+            timestamp = datetime.strptime(match.group(1), '%Y%m%d_%H%M%S')
+            if match.group(2).startswith('.db'):
+                backups.append((timestamp, filename))
+            else:
+                deltas.append((timestamp, filename))
+        
+        backups.sort(reverse=True)
+        
+        keep = set()
+        kept_bases = set()
+        hours_seen = set()
+        days_seen = set()
+        
+        for timestamp, filename in backups:
+            hour = timestamp.strftime('%Y%m%d%H')
+            day = timestamp.strftime('%Y%m%d')
+            
+            if hour not in hours_seen and len(hours_seen) < Config.BACKUP_KEEP_HOURLY:
+                hours_seen.add(hour)
+                keep.add(filename)
+                kept_bases.add(timestamp)
+            
+            if day not in days_seen and len(days_seen) < Config.BACKUP_KEEP_DAILY:
+                days_seen.add(day)
+                keep.add(filename)
+                kept_bases.add(timestamp)
+        
+        keep.update(filename for timestamp, filename in deltas if timestamp in kept_bases)
+        
+        removed = 0
+        for _, filename in backups + deltas:
+            if filename not in keep:
+                try:
+                    os.remove(os.path.join(backup_folder, filename))
+                    removed += 1
+                except OSError as e:
+                    logger.error(f"Error removing old backup {filename}: {str(e)}")
+        
+        if removed:
+            logger.info(f"Pruned {removed} old backups")
+        
+        return removed
+    
+    def add_class(self, course_name, class_date, groupe=None, subject_name=None):
+        """Add a class session; returns (success, class_id or error message)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('''
+                INSERT INTO classes (course_name, subject_name, class_date, groupe)
+                VALUES (?, ?, ?, ?)
+            ''', (course_name.strip(), subject_name, class_date, groupe))
+            
+            conn.commit()
+            logger.info(f"Class added: {cursor.lastrowid} - {course_name} ({class_date})")
+            return True, cursor.lastrowid
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Error adding class: {str(e)}")
+            return False, f"Database error: {str(e)}"
+        finally:
+            cursor.close()
+    
+    def _class_exists(self, cursor, class_id):
+        """Check that a class session exists before writing rows against it"""
+        cursor.execute("SELECT 1 FROM classes WHERE id = ?", (class_id,))
+        return cursor.fetchone() is not None
+    
+    def _upsert_attendance(self, cursor, class_id, statuses):
+        """
+        Upsert {student_id: status} for one class; only changed rows are rewritten.
+        Rows are staged and joined against students, so unknown ids are skipped;
+        returns the list of rejected student ids.
+        """
+        rejected = []
+        staged = []
+        for student_id, status in statuses.items():
+            try:
+                staged.append((int(student_id), status))
+            except (TypeError, ValueError):
+                rejected.append(student_id)
+        
+        cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS attendance_batch (
+                student_id INTEGER PRIMARY KEY,
+                status TEXT
+            )
+        ''')
+        cursor.execute("DELETE FROM attendance_batch")
+        cursor.executemany("INSERT INTO attendance_batch (student_id, status) VALUES (?, ?)", staged)
+        
+        cursor.execute('''
+            SELECT student_id FROM attendance_batch
+            WHERE student_id NOT IN (SELECT id FROM students)
+        ''')
+        rejected.extend(row[0] for row in cursor.fetchall())
+        
+        cursor.execute('''
+            INSERT INTO attendance (student_id, class_id, status)
+            SELECT b.student_id, ?, b.status
+            FROM attendance_batch b JOIN students s ON s.id = b.student_id
+            WHERE 1
+            ON CONFLICT(student_id, class_id) DO UPDATE SET status = excluded.status
+            WHERE status IS NOT excluded.status
+        ''', (class_id,))
+        
+        cursor.execute("DELETE FROM attendance_batch")
+        return rejected
     
-    def import_from_excel(self, file_path, groupe_name=None, progress_callback=None):
-        """Import students from Excel file"""
+    def record_attendance(self, class_id, statuses):
+        """
+        Record a whole session's attendance ({student_id: status}) in one transaction.
+        Returns (success, message, rejected) where rejected lists unknown student ids.
+        """
+        invalid = [status for status in statuses.values() if status not in Config.ATTENDANCE_STATUSES]
+        if invalid:
+            return False, f"Invalid attendance status: {invalid[0]}", []
+        
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
         try:
-            logger.info(f"Attempting to import from: {file_path}")
-            
-            # Check if file exists
-            if not os.path.exists(file_path):
-                return False, f"File not found: {file_path}", 0
+            if not self._class_exists(cursor, class_id):
+                return False, f"Class {class_id} not found", []
             
-            # Read Excel file
-            excel_file = pd.ExcelFile(file_path)
-            sheet_name = None
+            rejected = self._upsert_attendance(cursor, class_id, statuses)
+            conn.commit()
             
-            # Find the correct sheet
-            for possible_name in Config.POSSIBLE_SHEET_NAMES:
-                if possible_name in excel_file.sheet_names:
-                    sheet_name = possible_name
-                    break
+            recorded = len(statuses) - len(rejected)
+            message = f"Attendance recorded for {recorded} students"
+            if rejected:
+                message += f", {len(rejected)} rejected"
             
-            if sheet_name is None:
-                sheet_name = excel_file.sheet_names[0]
+            logger.info(f"Class {class_id}: {message}")
+            return True, message, rejected
             
-            logger.info(f"Reading sheet: {sheet_name}")
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Error recording attendance: {str(e)}")
+            return False, f"Database error: {str(e)}", []
+        finally:
+            cursor.close()
+    
+    def record_groupe_attendance(self, class_id, groupe, exceptions=None, default_status='Present'):
+        """
+        Mark every student of a group with default_status in one set-based
+        INSERT ... SELECT, then apply {student_id: status} exceptions.
+        Returns (success, message, rejected) where rejected lists exception ids
+        that are not students.
+        """
+        exceptions = exceptions or {}
+        statuses = [default_status] + list(exceptions.values())
+        invalid = [status for status in statuses if status not in Config.ATTENDANCE_STATUSES]
+        if invalid:
+            return False, f"Invalid attendance status: {invalid[0]}", []
+        
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            if not self._class_exists(cursor, class_id):
+                return False, f"Class {class_id} not found", []
             
-            # Validate required columns
-            missing_columns = [col for col in Config.REQUIRED_COLUMNS if col not in df.columns]
-            if missing_columns:
-                return False, f"Missing required columns: {', '.join(missing_columns)}", 0
+            cursor.execute('''
+                INSERT INTO attendance (student_id, class_id, status)
+                SELECT id, ?, ? FROM students WHERE groupe = ?
+                ON CONFLICT(student_id, class_id) DO UPDATE SET status = excluded.status
+                WHERE status IS NOT excluded.status
+            ''', (class_id, default_status, groupe))
             
-            # Import students
-            success_count = 0
-            error_count = 0
-            total = len(df)
+            rejected = []
+            if exceptions:
+                rejected = self._upsert_attendance(cursor, class_id, exceptions)
             
-            for idx, row in df.iterrows():
-                try:
-                    matricule = str(row['Matricule']).strip()
-                    nom = str(row['Nom']).strip()
-                    prenom = str(row['Prénom']).strip()
-                    section = str(row.get('Section', '')).strip() if 'Section' in row else None
-                    
-                    # Use provided group name or from Excel
-                    if groupe_name:
-                        groupe = groupe_name
-                    else:
-                        groupe = str(row.get('Groupe', '')).strip() if 'Groupe' in row else None
-                    
-                    success, _ = self.add_student(matricule, nom, prenom, section, groupe)
-                    
-                    if success:
-                        success_count += 1
-                    else:
-                        error_count += 1
-                    
-                    if progress_callback:
-                        progress = (idx + 1) / total
-                        progress_callback(progress)
-                        
-                except Exception as e:
-                    logger.error(f"Error importing row {idx}: {str(e)}")
-                    error_count += 1
+            conn.commit()
             
-            message = f"Import complete: {success_count} students added"
-            if error_count > 0:
-                message += f", {error_count} errors"
+            message = f"Attendance recorded for group {groupe}"
+            if rejected:
+                message += f", {len(rejected)} exceptions rejected"
             
-            logger.info(message)
-            return True, message, success_count
+            logger.info(f"Class {class_id}: {message}")
+            return True, message, rejected
             
-        except Exception as e:
-            error_msg = f"Error reading Excel file: {str(e)}"
-            logger.error(error_msg)
-            return False, error_msg, 0
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Error recording group attendance: {str(e)}")
+            return False, f"Database error: {str(e)}", []
+        finally:
+            cursor.close()
     
-    def export_to_excel(self, output_path, groupe=None):
-        """Export students to Excel file"""
+    def record_marks(self, class_id, rows):
+        """
+        Record a whole exam's scores in one transaction.
+        rows is {student_id: score} or an iterable of (student_id, score); blank
+        scores are stored as NULL. Returns (success, message, rejected) where
+        rejected is a DataFrame of student_id, score and reason.
+        """
+        items = list(rows.items()) if isinstance(rows, dict) else list(rows)
+        batch = pd.DataFrame(items, columns=['student_id', 'score'])
+        
+        # Vectorized range check against Config.MIN_SCORE/MAX_SCORE
+        raw_score = batch['score'].astype(object).where(batch['score'].notna(), None)
+        blank = raw_score.isna() | (raw_score.astype(str).str.strip() == '')
+        score = pd.to_numeric(raw_score.where(~blank, None), errors='coerce')
+        
+        # Ids typed into a sheet may arrive as text or floats
+        student_id = pd.to_numeric(batch['student_id'], errors='coerce')
+        bad_id = (student_id.isna() | (student_id % 1 != 0)).to_numpy()
+        
+        not_number = (score.isna() & ~blank).to_numpy()
+        out_of_range = ((score < Config.MIN_SCORE) | (score > Config.MAX_SCORE)).to_numpy()
+        
+        valid = ~(bad_id | not_number | out_of_range)
+        
+        # Only valid rows can shadow earlier entries for the same student
+        duplicate = student_id.where(valid).duplicated(keep='last').to_numpy() & valid
+        valid &= ~duplicate
+        
+        reason = np.select(
+            [bad_id, not_number, out_of_range, duplicate],
+            [
+                "Invalid student id",
+                "Score must be a number",
+                f"Score must be between {Config.MIN_SCORE} and {Config.MAX_SCORE}",
+                "Duplicate student in batch"
+            ],
+            default=''
+        )
+        rejected = batch[~valid].assign(reason=reason[~valid])
+        
+        clean = [
+            (int(sid), None if pd.isna(value) else float(value))
+            for sid, value in zip(student_id[valid], score[valid])
+        ]
+        
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
         try:
-            conn = sqlite3.connect(self.db_name)
-            
-            if groupe:
-                query = "SELECT * FROM students WHERE groupe = ? ORDER BY nom, prenom"
-                df = pd.read_sql_query(query, conn, params=(groupe,))
-            else:
-                query = "SELECT * FROM students ORDER BY nom, prenom"
-                df = pd.read_sql_query(query, conn)
-            
-            conn.close()
-            
-            # Save to Excel
-            df.to_excel(output_path, index=False, sheet_name='Students')
+            if not self._class_exists(cursor, class_id):
+                return False, f"Class {class_id} not found", rejected
             
-            return True, f"Data exported successfully to {output_path}"
+            # Stage the batch so unknown students are found with one join
+            cursor.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS marks_batch (
+                    student_id INTEGER PRIMARY KEY,
+                    score REAL
+                )
+            ''')
+            cursor.execute("DELETE FROM marks_batch")
+            cursor.executemany("INSERT INTO marks_batch (student_id, score) VALUES (?, ?)", clean)
             
-        except Exception as e:
-            logger.error(f"Excel export error: {str(e)}")
-            return False, f"Error exporting to Excel: {str(e)}"
-    
-    def backup_database(self):
-        """Create a backup of the database"""
-        try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_filename = f"backup_{timestamp}.db"
+            cursor.execute('''
+                SELECT student_id, score FROM marks_batch
+                WHERE student_id NOT IN (SELECT id FROM students)
+            ''')
+            unknown = pd.DataFrame(cursor.fetchall(), columns=['student_id', 'score'])
+            if len(unknown):
+                rejected = pd.concat([rejected, unknown.assign(reason="Unknown student")], ignore_index=True)
             
-            # Determine backup path
-            if platform == 'android':
-                storage_path = get_external_storage_path()
-                backup_folder = os.path.join(storage_path, 'StudentTrackerPro', Config.BACKUP_FOLDER)
-            else:
-                backup_folder = Config.BACKUP_FOLDER
+            # Triggers keep student_aggregates in sync with these writes
+            cursor.execute('''
+                INSERT INTO marks (student_id, class_id, score)
+                SELECT b.student_id, ?, b.score
+                FROM marks_batch b JOIN students s ON s.id = b.student_id
+                WHERE 1
+                ON CONFLICT(student_id, class_id) DO UPDATE SET score = excluded.score
+                WHERE score IS NOT excluded.score
+            ''', (class_id,))
             
-            os.makedirs(backup_folder, exist_ok=True)
-            backup_path = os.path.join(backup_folder, backup_filename)
+            cursor.execute("DELETE FROM marks_batch")
+            conn.commit()
             
-            # Copy database file
-            import shutil
-            shutil.copy2(self.db_name, backup_path)
+            recorded = len(clean) - len(unknown)
+            message = f"Marks recorded for {recorded} students"
+            if len(rejected):
+                message += f", {len(rejected)} rejected"
             
-            logger.info(f"Database backed up to: {backup_path}")
-            return True, backup_path
+            logger.info(f"Class {class_id}: {message}")
+            return True, message, rejected
             
-        except Exception as e:
-            logger.error(f"Backup error: {str(e)}")
-            return False, f"Backup failed: {str(e)}"
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Error recording marks: {str(e)}")
+            return False, f"Database error: {str(e)}", rejected
+        finally:
+            cursor.close()
     
     def get_student_statistics(self, student_id):
         """Get comprehensive statistics for a student"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         try:
@@ -869,40 +3446,34 @@ class StudentTrackerDB:
                 'lowest_score': 0
             }
             
-            # Attendance statistics
+            # Both aggregates are maintained by triggers: one primary-key lookup
             cursor.execute('''
-                SELECT status, COUNT(*) 
-                FROM attendance 
-                WHERE student_id = ? 
-                GROUP BY status
+                SELECT present_count, absent_count, justified_count,
+                       mark_count, score_count, score_sum, score_max, score_min
+                FROM student_aggregates
+                WHERE student_id = ?
             ''', (student_id,))
             
-            for status, count in cursor.fetchall():
-                if status == 'Present':
-                    stats['present_count'] = count
-                elif status == 'Absent':
-                    stats['absent_count'] = count
-                elif status == 'Absent Justifié':
-                    stats['justified_count'] = count
+            result = cursor.fetchone()
+            if result is None:
+                return stats
             
-            stats['total_classes'] = stats['present_count'] + stats['absent_count'] + stats['justified_count']
+            (present_count, absent_count, justified_count,
+             mark_count, score_count, score_sum, score_max, score_min) = result
             
-            if stats['total_classes'] > 0:
-                stats['attendance_rate'] = (stats['present_count'] / stats['total_classes']) * 100
+            stats['present_count'] = present_count
+            stats['absent_count'] = absent_count
+            stats['justified_count'] = justified_count
+            stats['total_classes'] = present_count + absent_count + justified_count
             
-            # Marks statistics
-            cursor.execute('''
-                SELECT COUNT(*), AVG(score), MAX(score), MIN(score)
-                FROM marks
-                WHERE student_id = ?
-            ''', (student_id,))
+            if stats['total_classes'] > 0:
+                stats['attendance_rate'] = (present_count / stats['total_classes']) * 100
             
-            result = cursor.fetchone()
-            if result and result[0] > 0:
-                stats['total_marks'] = result[0]
-                stats['average_score'] = round(result[1], 2) if result[1] else 0
-                stats['highest_score'] = result[2] if result[2] else 0
-                stats['lowest_score'] = result[3] if result[3] else 0
+            if mark_count > 0:
+                stats['total_marks'] = mark_count
+                stats['average_score'] = round(score_sum / score_count, 2) if score_count else 0
+                stats['highest_score'] = score_max if score_max else 0
+                stats['lowest_score'] = score_min if score_min else 0
             
             return stats
             
@@ -910,7 +3481,56 @@ class StudentTrackerDB:
             logger.error(f"Error getting student statistics: {str(e)}")
             return None
         finally:
-            conn.close()
+            cursor.close()
+    
+    def get_group_statistics(self, groupe):
+        """
+        Get attendance and marks statistics for every student in a group.
+        Returns a DataFrame (one row per student, same stat names as
+        get_student_statistics) read from student_aggregates in one query.
+        """
+        conn = self._get_connection()
+        
+        try:
+            query = '''
+                SELECT s.id AS student_id, s.matricule, s.nom, s.prenom,
+                       COALESCE(a.present_count, 0) AS present_count,
+                       COALESCE(a.absent_count, 0) AS absent_count,
+                       COALESCE(a.justified_count, 0) AS justified_count,
+                       COALESCE(a.mark_count, 0) AS total_marks,
+                       a.score_sum / NULLIF(a.score_count, 0) AS average_score,
+                       a.score_max AS highest_score,
+                       a.score_min AS lowest_score
+                FROM students s
+                LEFT JOIN student_aggregates a ON a.student_id = s.id
+                WHERE s.groupe = ?
+                ORDER BY s.nom, s.prenom, s.id
+            '''
+            stats = pd.read_sql_query(query, conn, params=(groupe,))
+            
+            # Derived columns, computed column-wise
+            stats['total_classes'] = stats['present_count'] + stats['absent_count'] + stats['justified_count']
+            stats['attendance_rate'] = (
+                stats['present_count'] / stats['total_classes'].replace(0, np.nan) * 100
+            ).fillna(0.0)
+            stats['average_score'] = stats['average_score'].fillna(0).round(2)
+            stats['highest_score'] = stats['highest_score'].fillna(0)
+            stats['lowest_score'] = stats['lowest_score'].fillna(0)
+            
+            return stats
+            
+        except Exception as e:
+            logger.error(f"Error getting group statistics: {str(e)}")
+            return None
+
+def export_groupe_file(db_name, groupe, output_path, cancel_event=None):
+    """Export worker: write one group's file through its own read-only connection"""
+    db = StudentTrackerDB(db_name, read_only=True)
+    
+    try:
+        return db.export_students(output_path, groupe, cancel_event=cancel_event)
+    finally:
+        db.close()
 
 # ============================================
 # CUSTOM UI COMPONENTS
@@ -1008,9 +3628,9 @@ class HeaderLabel(Label):
         self.rect.size = self.size
 
 class LoadingPopup(Popup):
-    """Loading popup with progress bar"""
+    """Loading popup with progress bar and an optional Cancel button"""
     
-    def __init__(self, **kwargs):
+    def __init__(self, on_cancel=None, **kwargs):
         content = BoxLayout(orientation='vertical', spacing=dp(15), padding=dp(20))
         
         self.message_label = Label(
@@ -1023,17 +3643,33 @@ class LoadingPopup(Popup):
         self.progress_bar = ProgressBar(max=1, value=0, size_hint_y=None, height=dp(30))
         content.add_widget(self.progress_bar)
         
+        self.cancel_btn = None
+        if on_cancel:
+            self.cancel_btn = ModernButton(
+                text='Cancel',
+                button_color=ERROR_COLOR,
+                size_hint_y=None,
+                height=dp(45)
+            )
+            self.cancel_btn.bind(on_press=lambda x: self._on_cancel(on_cancel))
+            content.add_widget(self.cancel_btn)
+        
         super().__init__(
             content=content,
-            size_hint=(0.7, 0.3),
+            size_hint=(0.7, 0.4 if on_cancel else 0.3),
             auto_dismiss=False,
             **kwargs
         )
     
     def update_progress(self, value, message=""):
         self.progress_bar.value = value
-        if message:
+        if message and not (self.cancel_btn and self.cancel_btn.disabled):
             self.message_label.text = message
+    
+    def _on_cancel(self, callback):
+        self.cancel_btn.disabled = True
+        self.message_label.text = 'Cancelling...'
+        callback()
 
 class ConfirmationDialog(Popup):
     """Confirmation dialog"""
@@ -1194,12 +3830,19 @@ class MainScreen(Screen):
         super().__init__(**kwargs)
         self.db = db
         self.current_page = 0
+        self.page_after = None  # Keyset cursors for the page being shown
+        self.page_before = None
+        self.page_first_key = None
+        self.page_last_key = None
         self.students_per_page = Config.STUDENTS_PER_PAGE
         self.total_students = 0
         self.selected_groupe = None
         self.search_mode = False
         self.search_term = ""
         self.pending_import_groupe = None  # Store group name for import
+        self.pending_import_mode = ('insert', False)  # (mode, remove_missing) for import
+        self.pending_import_all_sheets = False  # Import every sheet of each workbook
+        self.groupe_labels = {}  # Spinner label ("G10 (42)") -> groupe name
         
         self.build_ui()
         self.refresh_groups()
@@ -1315,19 +3958,36 @@ class MainScreen(Screen):
         action_row.add_widget(add_btn)
         
         import_btn = ModernButton(
-            text='📥 Import Excel',
+            text='📥 Import',
             button_color=PRIMARY_COLOR
         )
         import_btn.bind(on_press=self.show_import_dialog)
         action_row.add_widget(import_btn)
         
         export_btn = ModernButton(
-            text='📤 Export Excel',
+            text='📤 Export',
             button_color=ACCENT_COLOR
         )
         export_btn.bind(on_press=self.export_data)
         action_row.add_widget(export_btn)
         
+        self.export_format_spinner = Spinner(
+            text='Excel',
+            values=list(Config.EXPORT_FORMATS),
+            size_hint_x=0.6,
+            background_color=CARD_COLOR,
+            color=TEXT_PRIMARY,
+            font_size=sp(14)
+        )
+        action_row.add_widget(self.export_format_spinner)
+        
+        export_all_btn = ModernButton(
+            text='📦 Export All',
+            button_color=ACCENT_COLOR
+        )
+        export_all_btn.bind(on_press=self.export_all_groupes)
+        action_row.add_widget(export_all_btn)
+        
         backup_btn = ModernButton(
             text='💾 Backup',
             button_color=WARNING_COLOR
@@ -1349,42 +4009,57 @@ class MainScreen(Screen):
         return controls_card
     
     def refresh_groups(self):
-        """Refresh available groups"""
-        groupes = self.db.get_all_groupes()
-        self.groupe_spinner.values = ['All Groups'] + groupes
+        """Refresh available groups with their student counts"""
+        self.groupe_labels = {
+            f'{name} ({count})': name for name, count in self.db.get_groupe_counts()
+        }
+        self.groupe_spinner.values = ['All Groups'] + list(self.groupe_labels)
+        
+        # Keep the selected group's label in step with its new count
+        for label, name in self.groupe_labels.items():
+            if name == self.selected_groupe:
+                self.groupe_spinner.text = label
     
     def on_groupe_selected(self, spinner, text):
         """Handle group selection"""
         if text == 'All Groups':
-            self.selected_groupe = None
+            groupe = None
         else:
-            self.selected_groupe = text
+            groupe = self.groupe_labels.get(text, text)
         
-        self.current_page = 0
+        # A relabelled count for the same group is not a new selection
+        if text != 'All Groups' and groupe == self.selected_groupe:
+            return
+        
+        self.selected_groupe = groupe
+        self._reset_page()
         self.load_students()
     
     def load_students(self):
         """Load and display students"""
-        offset = self.current_page * self.students_per_page
+        students, total = self.db.get_students_page(
+            groupe=self.selected_groupe,
+            search_term=self.search_term if self.search_mode else None,
+            after=self.page_after,
+            before=self.page_before,
+            limit=self.students_per_page
+        )
         
-        if self.search_mode:
-            students, total = self.db.get_all_students(
-                groupe=self.selected_groupe,
-                search_term=self.search_term,
-                offset=offset,
-                limit=self.students_per_page
-            )
-        else:
-            students, total = self.db.get_all_students(
-                groupe=self.selected_groupe,
-                offset=offset,
-                limit=self.students_per_page
-            )
+        # Remember the page edges as (nom, prenom, id) for change_page
+        if students:
+            self.page_first_key = (students[0][2], students[0][3], students[0][0])
+            self.page_last_key = (students[-1][2], students[-1][3], students[-1][0])
         
         self.total_students = total
         self.display_students(students)
         self.update_pagination()
     
+    def _reset_page(self):
+        """Go back to the first page"""
+        self.current_page = 0
+        self.page_after = None
+        self.page_before = None
+    
     def display_students(self, students):
         """Display students in a scrollable list"""
         self.students_container.clear_widgets()
@@ -1528,8 +4203,16 @@ class MainScreen(Screen):
         self.pagination_layout.add_widget(next_btn)
     
     def change_page(self, direction):
-        """Change current page"""
+        """Change current page by seeking from the current page's edge row"""
         self.current_page += direction
+        
+        if self.current_page <= 0:
+            self._reset_page()
+        elif direction > 0:
+            self.page_after, self.page_before = self.page_last_key, None
+        else:
+            self.page_after, self.page_before = None, self.page_first_key
+        
         self.load_students()
     
     def search_students(self, instance):
@@ -1539,7 +4222,7 @@ class MainScreen(Screen):
         if search_text:
             self.search_mode = True
             self.search_term = search_text
-            self.current_page = 0
+            self._reset_page()
             self.load_students()
         else:
             self.clear_search()
@@ -1549,7 +4232,7 @@ class MainScreen(Screen):
         self.search_mode = False
         self.search_term = ""
         self.search_input.text = ""
-        self.current_page = 0
+        self._reset_page()
         self.load_students()
     
     def show_add_student_dialog(self, instance):
@@ -1821,20 +4504,21 @@ class MainScreen(Screen):
         
         if success:
             show_success(message)
+            self.refresh_groups()
             self.refresh_data()
         else:
             show_error(message)
     
     def show_import_dialog(self, instance):
-        """Show dialog for Excel import with group name input"""
+        """Show dialog for student file import with group name input"""
         content = BoxLayout(orientation='vertical', spacing=dp(15), padding=dp(20))
         
         # Instructions
         instructions = Label(
             text=(
-                "[b]Import Students from Excel[/b]\n\n"
-                "You can optionally specify a group name that will be "
-                "assigned to all imported students."
+                "[b]Import Students from Excel, CSV or Parquet[/b]\n\n"
+                "Select one or more files. You can optionally specify a group "
+                "name that will be assigned to all imported students."
             ),
             markup=True,
             halign='center',
@@ -1866,12 +4550,56 @@ class MainScreen(Screen):
         group_card.add_widget(group_layout)
         content.add_widget(group_card)
         
+        # Import mode: (mode, remove_missing) for import_from_excel
+        import_modes = {
+            'Add new students only': ('insert', False),
+            'Sync: add new, update changed': ('sync', False),
+            'Sync and remove students missing from file': ('sync', True)
+        }
+        
+        mode_card = ModernCard(size_hint_y=None, height=dp(70))
+        mode_layout = BoxLayout(spacing=dp(10))
+        mode_layout.add_widget(ModernLabel(
+            text='Import Mode:',
+            size_hint_x=0.4
+        ))
+        mode_spinner = Spinner(
+            text='Add new students only',
+            values=list(import_modes),
+            size_hint_x=0.6,
+            background_color=CARD_COLOR,
+            color=TEXT_PRIMARY,
+            font_size=sp(14)
+        )
+        mode_layout.add_widget(mode_spinner)
+        mode_card.add_widget(mode_layout)
+        content.add_widget(mode_card)
+        
+        # Workbooks with one sheet per group
+        sheets_card = ModernCard(size_hint_y=None, height=dp(60))
+        sheets_layout = BoxLayout(spacing=dp(10))
+        all_sheets_checkbox = CheckBox(size_hint_x=0.1, color=PRIMARY_COLOR)
+        sheets_layout.add_widget(all_sheets_checkbox)
+        sheets_layout.add_widget(ModernLabel(
+            text='Import every sheet (a sheet without a Groupe column becomes its own group)',
+            size_hint_x=0.9
+        ))
+        sheets_card.add_widget(sheets_layout)
+        content.add_widget(sheets_card)
+        
         # Buttons
         btn_layout = BoxLayout(size_hint_y=None, height=dp(55), spacing=dp(10))
         
         def do_browse(instance):
-            # Store group name
+            # Store group name and import mode
             self.pending_import_groupe = group_input.text.strip() or None
+            self.pending_import_mode = import_modes[mode_spinner.text]
+            self.pending_import_all_sheets = all_sheets_checkbox.active
+            
+            if self.pending_import_mode[1] and not self.pending_import_groupe:
+                show_error("Enter the group whose missing students should be removed")
+                return
+            
             popup.dismiss()
             
             # Open file picker
@@ -1899,20 +4627,33 @@ class MainScreen(Screen):
         content.add_widget(btn_layout)
         
         popup = Popup(
-            title='Import Excel File',
+            title='Import Students',
             content=content,
-            size_hint=(0.8, 0.5)
+            size_hint=(0.8, 0.7)
         )
         popup.open()
     
     def handle_file_selection(self, file_path):
-        """Handle file selected from Android file picker"""
+        """Handle the file, or list of files, selected from Android file picker"""
         if file_path:
             logger.info(f"File selected: {file_path}")
-            self.import_excel(file_path, self.pending_import_groupe)
+            self.start_import(file_path if isinstance(file_path, list) else [file_path])
         else:
             show_error("No file selected or file access failed")
     
+    def start_import(self, file_paths):
+        """Import one file directly, or several files / every sheet through the batch pipeline"""
+        if len(file_paths) == 1 and not self.pending_import_all_sheets:
+            self.import_excel(file_paths[0], self.pending_import_groupe, *self.pending_import_mode)
+            return
+        
+        mode, remove_missing = self.pending_import_mode
+        if remove_missing:
+            show_error("Removing missing students works with a single file and sheet only")
+            return
+        
+        self.import_batch(file_paths, self.pending_import_groupe, mode, self.pending_import_all_sheets)
+    
     def open_desktop_file_chooser(self):
         """Open desktop file chooser (for non-Android platforms)"""
         content = BoxLayout(orientation='vertical', spacing=dp(10), padding=dp(10))
@@ -1920,7 +4661,8 @@ class MainScreen(Screen):
         # File chooser
         file_chooser = FileChooserListView(
             path=os.path.expanduser('~'),
-            filters=['*.xlsx', '*.xls'],
+            filters=['*.xlsx', '*.xls', '*.csv', '*.parquet'],
+            multiselect=True,
             size_hint_y=0.85
         )
         content.add_widget(file_chooser)
@@ -1930,9 +4672,9 @@ class MainScreen(Screen):
         
         def do_import(instance):
             if file_chooser.selection:
-                file_path = file_chooser.selection[0]
+                file_paths = list(file_chooser.selection)
                 popup.dismiss()
-                self.import_excel(file_path, self.pending_import_groupe)
+                self.start_import(file_paths)
             else:
                 show_error("Please select a file")
         
@@ -1953,14 +4695,17 @@ class MainScreen(Screen):
         content.add_widget(btn_layout)
         
         popup = Popup(
-            title='Select Excel File',
+            title='Select Import File',
             content=content,
             size_hint=(0.9, 0.9)
         )
         popup.open()
     
-    def import_excel(self, file_path, groupe_name):
-        """Import Excel file with progress indicator"""
+    def import_excel(self, file_path, groupe_name, mode='insert', remove_missing=False, force=False):
+        """
+        Import a student file with progress indicator. A file already imported
+        with the same group and mode asks for confirmation before importing again.
+        """
         loading = LoadingPopup(title='Importing Students...')
         loading.open()
         
@@ -1968,17 +4713,130 @@ class MainScreen(Screen):
             loading.update_progress(value, f'Importing... {int(value * 100)}%')
         
         def do_import():
-            success, message, count = self.db.import_from_excel(
-                file_path,
-                groupe_name,
-                progress_callback=update_progress
-            )
+            try:
+                previous = None
+                if not force:
+                    previous = self.db.find_previous_import(file_path, groupe_name, mode, remove_missing)
+                
+                if previous:
+                    Clock.schedule_once(
+                        lambda dt: self._confirm_reimport(
+                            loading, previous, file_path, groupe_name, mode, remove_missing
+                        ), 0
+                    )
+                    return
+                
+                # Already checked against the ledger above
+                success, message, count = self.db.import_from_excel(
+                    file_path,
+                    groupe_name,
+                    progress_callback=update_progress,
+                    mode=mode,
+                    remove_missing=remove_missing,
+                    force=True
+                )
+            except Exception as e:
+                logger.error(f"Import error: {str(e)}")
+                success, message = False, f"Import failed: {str(e)}"
+            finally:
+                self.db.release_connection()
             
             Clock.schedule_once(lambda dt: self._import_complete(loading, success, message), 0)
         
         thread = threading.Thread(target=do_import)
         thread.start()
     
+    def import_batch(self, file_paths, groupe_name, mode='insert', all_sheets=False, force=False):
+        """
+        Import several files (or every sheet) in parallel with per-file progress.
+        Files already imported with the same group, mode and sheet scope ask for
+        confirmation before importing again.
+        """
+        loading = LoadingPopup(title=f'Importing {len(file_paths)} Files...')
+        loading.open()
+        
+        def update_progress(value, label):
+            Clock.schedule_once(
+                lambda dt: loading.update_progress(value, f'Imported {label}\n{int(value * 100)}%'), 0
+            )
+        
+        def do_import():
+            try:
+                previous = {}
+                if not force:
+                    for file_path in file_paths:
+                        entry = self.db.find_previous_import(file_path, groupe_name, mode, all_sheets=all_sheets)
+                        if entry:
+                            previous[file_path] = entry
+                
+                if previous:
+                    Clock.schedule_once(
+                        lambda dt: self._confirm_batch_reimport(
+                            loading, previous, file_paths, groupe_name, mode, all_sheets
+                        ), 0
+                    )
+                    return
+                
+                # Already checked against the ledger above
+                success, message, count = self.db.import_files(
+                    file_paths,
+                    groupe_name,
+                    all_sheets=all_sheets,
+                    mode=mode,
+                    force=True,
+                    progress_callback=update_progress
+                )
+            except Exception as e:
+                logger.error(f"Batch import error: {str(e)}")
+                success, message = False, f"Import failed: {str(e)}"
+            finally:
+                self.db.release_connection()
+            
+            Clock.schedule_once(lambda dt: self._import_complete(loading, success, message), 0)
+        
+        thread = threading.Thread(target=do_import, daemon=True)
+        thread.start()
+    
+    def _confirm_reimport(self, loading_popup, previous, file_path, groupe_name, mode, remove_missing):
+        """Ask before importing a file whose content was already imported"""
+        loading_popup.dismiss()
+        
+        message = (
+            f"This file was already imported on {previous['imported_at']}\n"
+            f"({previous['file_name']}, {previous['imported_count']} students added).\n\n"
+            "Import it again?"
+        )
+        
+        ConfirmationDialog(
+            message=message,
+            on_yes=lambda: self.import_excel(file_path, groupe_name, mode, remove_missing, force=True)
+        ).open()
+    
+    def _confirm_batch_reimport(self, loading_popup, previous, file_paths, groupe_name, mode, all_sheets):
+        """Ask before importing files whose content was already imported; No imports only the new ones"""
+        loading_popup.dismiss()
+        
+        names = "\n".join(
+            f"{os.path.basename(file_path)} ({entry['imported_at']})"
+            for file_path, entry in previous.items()
+        )
+        new_paths = [file_path for file_path in file_paths if file_path not in previous]
+        
+        message = (
+            f"{len(previous)} of {len(file_paths)} files were already imported:\n"
+            f"{names}\n\nImport them again?"
+        )
+        if new_paths:
+            message += "\n(No imports only the new files)"
+        
+        ConfirmationDialog(
+            message=message,
+            on_yes=lambda: self.import_batch(file_paths, groupe_name, mode, all_sheets, force=True),
+            on_no=(
+                lambda: self.import_batch(new_paths, groupe_name, mode, all_sheets, force=True)
+            ) if new_paths else None
+        ).open()
+    
     def _import_complete(self, loading_popup, success, message):
         """Handle import completion"""
         loading_popup.dismiss()
@@ -1991,34 +4849,131 @@ class MainScreen(Screen):
             show_error(message, 'Import Failed')
     
     def export_data(self, instance):
-        """Export current data to Excel"""
+        """Export the selected group on a background thread, with progress and cancel"""
         if not self.selected_groupe:
             show_error("Please select a group first")
             return
         
+        extension = Config.EXPORT_FORMATS[self.export_format_spinner.text]
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"export_{self.selected_groupe}_{timestamp}.xlsx"
-        
-        # Determine export path
-        if platform == 'android':
-            storage_path = get_external_storage_path()
-            export_folder = os.path.join(storage_path, 'StudentTrackerPro', 'exports')
-        else:
-            export_folder = 'exports'
+        filename = f"export_{self.selected_groupe}_{timestamp}{extension}"
         
+        export_folder = self.db.get_export_folder()
         os.makedirs(export_folder, exist_ok=True)
         output_path = os.path.join(export_folder, filename)
         
-        success, message = self.db.export_to_excel(output_path, self.selected_groupe)
+        groupe = self.selected_groupe
+        total = self.db.count_students(groupe=groupe)
+        cancel_event = threading.Event()
+        
+        loading = LoadingPopup(title='Exporting Students...', on_cancel=cancel_event.set)
+        loading.open()
+        
+        def update_progress(value):
+            Clock.schedule_once(
+                lambda dt: loading.update_progress(
+                    value, f'Exporting... {int(value * total)} of {total} students'
+                ), 0
+            )
+        
+        def do_export():
+            try:
+                success, message = self.db.export_students(
+                    output_path,
+                    groupe,
+                    progress_callback=update_progress,
+                    cancel_event=cancel_event
+                )
+            finally:
+                self.db.release_connection()
+            
+            cancelled = not success and cancel_event.is_set()
+            Clock.schedule_once(lambda dt: self._export_complete(loading, success, message, cancelled), 0)
+        
+        thread = threading.Thread(target=do_export, daemon=True)
+        thread.start()
+    
+    def _export_complete(self, loading_popup, success, message, cancelled=False):
+        """Handle export completion"""
+        loading_popup.dismiss()
         
         if success:
             show_success(message, 'Export Successful')
+        elif cancelled:
+            show_info("Export cancelled, the partial file was removed", 'Export Cancelled')
+        else:
+            show_error(message, 'Export Failed')
+    
+    def export_all_groupes(self, instance):
+        """Export one file per group in the selected format, in parallel, with progress and cancel"""
+        extension = Config.EXPORT_FORMATS[self.export_format_spinner.text]
+        cancel_event = threading.Event()
+        
+        loading = LoadingPopup(title='Exporting All Groups...', on_cancel=cancel_event.set)
+        loading.open()
+        
+        def update_progress(value):
+            Clock.schedule_once(
+                lambda dt: loading.update_progress(value, f'Exporting... {int(value * 100)}%'), 0
+            )
+        
+        def do_export():
+            try:
+                success, message, paths = self.db.export_all_groupes(
+                    self.db.get_export_folder(),
+                    extension,
+                    progress_callback=update_progress,
+                    cancel_event=cancel_event
+                )
+            except Exception as e:
+                logger.error(f"Export all groups error: {str(e)}")
+                success, message = False, f"Export failed: {str(e)}"
+            finally:
+                self.db.release_connection()
+            
+            cancelled = not success and cancel_event.is_set()
+            Clock.schedule_once(lambda dt: self._export_all_complete(loading, success, message, cancelled), 0)
+        
+        thread = threading.Thread(target=do_export, daemon=True)
+        thread.start()
+    
+    def _export_all_complete(self, loading_popup, success, message, cancelled=False):
+        """Handle export all groups completion"""
+        loading_popup.dismiss()
+        
+        if success:
+            show_success(message, 'Export Complete')
+        elif cancelled:
+            show_info("Export cancelled, the files written so far were removed", 'Export Cancelled')
         else:
             show_error(message, 'Export Failed')
     
     def backup_database(self, instance):
-        """Create database backup"""
-        success, result = self.db.backup_database()
+        """Create database backup on a background thread with progress"""
+        loading = LoadingPopup(title='Backing Up Database...')
+        loading.open()
+        
+        def update_progress(value):
+            Clock.schedule_once(
+                lambda dt: loading.update_progress(value, f'Backing up... {int(value * 100)}%'), 0
+            )
+        
+        def do_backup():
+            try:
+                success, result = self.db.backup_database(progress_callback=update_progress)
+                if success:
+                    self.db.prune_backups()
+            finally:
+                self.db.release_connection()
+            
+            Clock.schedule_once(lambda dt: self._backup_complete(loading, success, result), 0)
+        
+        thread = threading.Thread(target=do_backup, daemon=True)
+        thread.start()
+    
+    def _backup_complete(self, loading_popup, success, result):
+        """Handle backup completion"""
+        loading_popup.dismiss()
         
         if success:
             show_success(f"Database backed up successfully!\n\n{result}", 'Backup Complete')
@@ -2067,17 +5022,41 @@ class StudentTrackerApp(App):
         return sm
     
     def auto_backup(self):
-        """Perform automatic database backup"""
-        success, result = self.db.backup_database()
-        if success:
-            logger.info(f"Auto-backup completed: {result}")
-        else:
-            logger.error(f"Auto-backup failed: {result}")
+        """Perform automatic database backup on a background thread"""
+        if not self.db.has_changes_since_backup():
+            logger.info("Auto-backup skipped: no changes since last backup")
+            return
+        
+        def do_backup():
+            try:
+                success, result = self.scheduled_backup()
+                if success:
+                    self.db.prune_backups()
+            finally:
+                self.db.release_connection()
+            
+            if success:
+                logger.info(f"Auto-backup completed: {result}")
+            else:
+                logger.error(f"Auto-backup failed: {result}")
+        
+        thread = threading.Thread(target=do_backup, daemon=True)
+        thread.start()
+    
+    def scheduled_backup(self, wait=False):
+        """Run the backup kind selected by Config.BACKUP_MODE"""
+        if Config.BACKUP_MODE == 'incremental':
+            return self.db.backup_incremental(wait=wait)
+        
+        return self.db.backup_database(wait=wait)
     
     def on_stop(self):
         """Cleanup when app closes"""
         logger.info("Application closing")
-        self.db.backup_database()
+        # Waits for a running background backup before taking the final one
+        if self.db.has_changes_since_backup():
+            self.scheduled_backup(wait=True)
+        self.db.close()
 
 if __name__ == '__main__':
     StudentTrackerApp().run()
@@ -0,0 +1,63 @@
+# Tests for the StudentTrackerDB data layer (no window is opened)
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+main = pytest.importorskip('main')
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Fresh database in a temporary folder; backups and exports land next to it"""
+    monkeypatch.chdir(tmp_path)
+    database = main.StudentTrackerDB(str(tmp_path / 'students.db'))
+    yield database
+    database.close()
+
+
+def test_backup_skipped_without_changelog_when_unchanged(db):
+    db.changelog_enabled = False
+    db.add_student('123456789012', 'Nom', 'Prenom', 'S1', 'G1')
+
+    assert db.has_changes_since_backup()
+    success, _ = db.backup_database()
+    assert success
+
+    # Nothing was committed since, so the next (auto) backup is skipped
+    assert not db.has_changes_since_backup()
+
+    db.add_student('123456789013', 'Nom', 'Prenom', 'S1', 'G1')
+    assert db.has_changes_since_backup()
+
+
+def test_export_all_groupes_with_hash_in_database_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    folder = tmp_path / 'dir#1'
+    folder.mkdir()
+    database = main.StudentTrackerDB(str(folder / 'students.db'))
+
+    try:
+        database.add_student('123456789012', 'Nom', 'Prenom', 'S1', 'G1')
+
+        success, message, paths = database.export_all_groupes(str(tmp_path / 'out'), '.csv', workers=1)
+
+        assert success, message
+        assert len(paths) == 1 and os.path.exists(paths[0])
+    finally:
+        database.close()
+
+
+def test_export_all_groupes_keeps_groups_whose_names_sanitise_alike(db, tmp_path):
+    db.add_student('123456789012', 'Nom', 'Prenom', 'S1', 'G 1')
+    db.add_student('123456789013', 'Nom', 'Prenom', 'S1', 'G_1')
+
+    success, message, paths = db.export_all_groupes(str(tmp_path / 'out'), '.csv', workers=1)
+
+    assert success, message
+    assert len(set(paths)) == 2
+    assert all(os.path.exists(path) for path in paths)
+    assert len(os.listdir(tmp_path / 'out')) == 2